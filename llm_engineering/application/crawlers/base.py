@@ -1,13 +1,20 @@
 from abc import ABC, abstractmethod
 import time
+from functools import cache
 from tempfile import mkdtemp
 import chromedriver_autoinstaller
+from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
 from llm_engineering.domain.documents import NoSQLBaseDocument
 
-print(chromedriver_autoinstaller.install())
+
+@cache
+def install_chromedriver() -> None:
+    """Installs the chromedriver matching the local Chrome version, once per process and only when needed."""
+
+    logger.info(f"Chromedriver path: {chromedriver_autoinstaller.install()}")
 
 class BaseCrawler(ABC):
     model: type[NoSQLBaseDocument]
@@ -18,6 +25,8 @@ class BaseCrawler(ABC):
 class BaseSeleniumCrawler(BaseCrawler, ABC): 
 
     def __init__(self, scroll_limit: int = 5) -> None:
+        install_chromedriver()
+
         options = webdriver.ChromeOptions()
 
         options.add_argument("--no-sandbox")
@@ -1,3 +1,12 @@
+from .cache import EmbeddingCache
 from .embeddings import CrossEncoderModelSingleton, EmbeddingModelSingleton
+from .micro_batching import MicroBatcher
+from .pool import EmbeddingProcessPool
 
-__all__ = ["EmbeddingModelSingleton", "CrossEncoderModelSingleton"]
+__all__ = [
+    "EmbeddingModelSingleton",
+    "CrossEncoderModelSingleton",
+    "EmbeddingCache",
+    "EmbeddingProcessPool",
+    "MicroBatcher",
+]
@@ -0,0 +1,93 @@
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from llm_engineering.domain.exceptions import ImproperlyConfigured
+from llm_engineering.settings import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers.cross_encoder import CrossEncoder
+    from sentence_transformers.SentenceTransformer import SentenceTransformer
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_sentence_transformer(
+    model_id: str, device: str, backend: str | None = None, cache_dir: Path | None = None
+) -> "SentenceTransformer":
+    """
+    Loads a sentence transformer model with the given inference backend.
+
+    Args:
+        model_id (str): The identifier of the pre-trained model.
+        device (str): The device to run the model on.
+        backend (str, optional): One of 'torch', 'onnx' or 'onnx-int8'. Defaults to the RAG_MODEL_BACKEND setting.
+        cache_dir (Path, optional): The directory where the downloaded models are cached.
+
+    Returns:
+        SentenceTransformer: The loaded model.
+    """
+
+    from sentence_transformers.SentenceTransformer import SentenceTransformer
+
+    return _load_model(
+        SentenceTransformer,
+        model_id,
+        device=device,
+        backend=backend or settings.RAG_MODEL_BACKEND,
+        cache_folder=str(cache_dir) if cache_dir else None,
+    )
+
+
+def load_cross_encoder(model_id: str, device: str, backend: str | None = None) -> "CrossEncoder":
+    """
+    Loads a cross-encoder model with the given inference backend.
+
+    Args:
+        model_id (str): The identifier of the pre-trained model.
+        device (str): The device to run the model on.
+        backend (str, optional): One of 'torch', 'onnx' or 'onnx-int8'. Defaults to the RAG_MODEL_BACKEND setting.
+
+    Returns:
+        CrossEncoder: The loaded model.
+    """
+
+    from sentence_transformers.cross_encoder import CrossEncoder
+
+    return _load_model(CrossEncoder, model_id, device=device, backend=backend or settings.RAG_MODEL_BACKEND)
+
+
+def _load_model(model_cls: type, model_id: str, device: str, backend: str, **kwargs):
+    if backend == "torch":
+        return model_cls(model_id, device=device, **kwargs)
+
+    if backend == "onnx":
+        return model_cls(model_id, device=device, backend="onnx", **kwargs)
+
+    if backend == "onnx-int8":
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        quantization_config = settings.RAG_ONNX_QUANTIZATION_CONFIG
+        export_dir = Path(settings.RAG_ONNX_EXPORT_DIR) / re.sub(r"[^\w.-]", "__", model_id)
+        # The export names the file after the weights dtype (e.g. quint8 for avx2, qint8 for arm64), so pin the
+        # suffix explicitly to load the exact file that was written.
+        file_suffix = f"int8_{quantization_config}"
+        file_name = f"onnx/model_{file_suffix}.onnx"
+
+        if not (export_dir / file_name).exists():
+            logger.info(f"Exporting a dynamically int8-quantized ONNX graph for {model_id=} to '{export_dir}'.")
+
+            model = model_cls(model_id, device=device, backend="onnx", **kwargs)
+            model.save_pretrained(str(export_dir))
+            export_dynamic_quantized_onnx_model(
+                model,
+                quantization_config=quantization_config,
+                model_name_or_path=str(export_dir),
+                file_suffix=file_suffix,
+            )
+
+        return model_cls(str(export_dir), device=device, backend="onnx", model_kwargs={"file_name": file_name}, **kwargs)
+
+    raise ImproperlyConfigured(f"Unsupported model backend '{backend}'. Choose one of {SUPPORTED_BACKENDS}.")
@@ -0,0 +1,65 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    from sentence_transformers.SentenceTransformer import SentenceTransformer
+
+
+def token_budget_batches(lengths: list[int], token_budget: int) -> list[list[int]]:
+    """
+    Groups inputs into batches whose padded size (batch size x longest input) fits in the token budget.
+
+    Inputs are sorted by length first, so every batch holds inputs of similar length and padding is minimal.
+
+    Args:
+        lengths (list[int]): The tokenized length of every input.
+        token_budget (int): The maximum number of (padded) tokens per batch.
+
+    Returns:
+        list[list[int]]: The indices of the inputs that make up each batch.
+    """
+
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+
+    batches = []
+    current_batch = []
+    for i in order:
+        # Inputs are visited from the longest to the shortest, so the first input sets the padded length.
+        padded_length = max(lengths[current_batch[0]] if current_batch else lengths[i], 1)
+        if current_batch and padded_length * (len(current_batch) + 1) > token_budget:
+            batches.append(current_batch)
+            current_batch = []
+        current_batch.append(i)
+
+    if current_batch:
+        batches.append(current_batch)
+
+    return batches
+
+
+def encode_length_bucketed(model: "SentenceTransformer", input_text: list[str], token_budget: int) -> NDArray[np.float32]:
+    """
+    Encodes the input texts in token-budgeted, length-sorted batches and restores the original order.
+
+    Args:
+        model (SentenceTransformer): The model used to encode the texts.
+        input_text (list[str]): The input texts to generate embeddings for.
+        token_budget (int): The maximum number of (padded) tokens per forward pass.
+
+    Returns:
+        np.ndarray: A float32 matrix with one embedding per input text, in the input order.
+    """
+
+    embeddings = np.empty((len(input_text), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if len(input_text) == 0:
+        return embeddings
+
+    input_ids = model.tokenizer(input_text, truncation=True, max_length=model.max_seq_length)["input_ids"]
+    lengths = [len(ids) for ids in input_ids]
+
+    for batch in token_budget_batches(lengths, token_budget):
+        embeddings[batch] = model.encode([input_text[i] for i in batch], batch_size=len(batch))
+
+    return embeddings
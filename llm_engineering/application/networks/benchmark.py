@@ -0,0 +1,224 @@
+import json
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime as dt
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+
+from llm_engineering.application.preprocessing.chunking_data_handlers import (
+    ArticleChunkingHandler,
+    PostChunkingHandler,
+    RepositoryChunkingHandler,
+)
+from llm_engineering.domain.types import DataCategory
+from llm_engineering.settings import settings
+
+from .embeddings import CrossEncoderModelSingleton, EmbeddingModelSingleton
+
+_VOCABULARY = (
+    "the a of to and in is for with on that this model data vector embedding retrieval query chunk llm rag "
+    "pipeline feature training inference latency throughput batch token transformer attention layer gpu cpu "
+    "qdrant mongodb zenml python def return import class self list dict str int float none true false async "
+    "await config settings document article post repository author search rerank score context prompt"
+).split()
+
+_BENCHMARK_QUERIES = [
+    "Write an article about the best types of advanced RAG methods.",
+    "How do I deploy an LLM twin with a feature pipeline?",
+    "What is the difference between a bi-encoder and a cross-encoder?",
+]
+
+
+def generate_synthetic_chunks(data_category: DataCategory, num_chunks: int, seed: int = 42) -> list[str]:
+    """
+    Generates synthetic chunks with the same character lengths as the ones produced by the chunking handlers.
+
+    Args:
+        data_category (DataCategory): The category of the chunks: posts, articles or repositories.
+        num_chunks (int): The number of chunks to generate.
+        seed (int): The seed of the random generator, so runs are comparable. Defaults to 42.
+
+    Returns:
+        list[str]: The synthetic chunks.
+    """
+
+    if data_category == DataCategory.POSTS:
+        chunk_size = PostChunkingHandler().metadata["chunk_size"]
+        min_length, max_length = chunk_size // 2, chunk_size
+    elif data_category == DataCategory.ARTICLES:
+        metadata = ArticleChunkingHandler().metadata
+        min_length, max_length = metadata["min_length"], metadata["max_length"]
+    elif data_category == DataCategory.REPOSITORIES:
+        chunk_size = RepositoryChunkingHandler().metadata["chunk_size"]
+        min_length, max_length = chunk_size // 2, chunk_size
+    else:
+        raise ValueError("Unsupported data type")
+
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(num_chunks):
+        target_length = rng.randint(min_length, max_length)
+        words = []
+        length = 0
+        while length < target_length:
+            word = rng.choice(_VOCABULARY)
+            words.append(word)
+            length += len(word) + 1
+        chunks.append(" ".join(words)[:target_length])
+
+    return chunks
+
+
+def run_models_benchmark(
+    batch_sizes: tuple[int, ...] = (1, 8, 32, 128),
+    num_threads: tuple[int, ...] | None = None,
+    num_chunks: int = 256,
+    output_path: Path | None = None,
+) -> dict:
+    """
+    Measures the throughput and latency of the embedding and cross-encoder models on synthetic chunks.
+
+    Args:
+        batch_sizes (tuple[int, ...]): The batch sizes to benchmark.
+        num_threads (tuple[int, ...], optional): The torch thread counts to benchmark. Defaults to 1 and all cores.
+        num_chunks (int): The number of synthetic chunks per data category. Defaults to 256.
+        output_path (Path, optional): Where to write the JSON results. Defaults to 'benchmarks/models_<timestamp>.json'.
+
+    Returns:
+        dict: The benchmark results.
+    """
+
+    import torch
+
+    cpu_count = os.cpu_count() or 1
+    num_threads = num_threads or tuple(sorted({1, cpu_count}))
+    output_path = output_path or Path("benchmarks") / f"models_{dt.now().strftime('%Y_%m_%d_%H_%M_%S')}.json"
+
+    embedding_model = EmbeddingModelSingleton()
+    cross_encoder_model = CrossEncoderModelSingleton()
+
+    chunks = {
+        category: generate_synthetic_chunks(category, num_chunks)
+        for category in (DataCategory.POSTS, DataCategory.ARTICLES, DataCategory.REPOSITORIES)
+    }
+
+    results = []
+    initial_num_threads = torch.get_num_threads()
+    try:
+        for threads in num_threads:
+            torch.set_num_threads(threads)
+
+            for category, category_chunks in chunks.items():
+                num_tokens = _count_tokens(embedding_model.tokenizer, category_chunks, embedding_model.max_input_length)
+                for batch_size in batch_sizes:
+                    # The underlying model is called directly, so every batch is a single forward pass instead of
+                    # being re-split by the token budget of the length-bucketed encoding.
+                    stats = _measure(
+                        lambda batch: embedding_model._model.encode(batch, batch_size=len(batch)),
+                        category_chunks,
+                        batch_size,
+                    )
+                    results.append(
+                        _to_result("embedding", category, threads, batch_size, len(category_chunks), num_tokens, stats)
+                    )
+
+                pairs = [
+                    (_BENCHMARK_QUERIES[i % len(_BENCHMARK_QUERIES)], chunk) for i, chunk in enumerate(category_chunks)
+                ]
+                num_tokens = _count_tokens(
+                    cross_encoder_model.tokenizer, pairs, cross_encoder_model.tokenizer.model_max_length
+                )
+                for batch_size in batch_sizes:
+                    stats = _measure(
+                        lambda batch: cross_encoder_model._model.predict(batch, batch_size=len(batch)),
+                        pairs,
+                        batch_size,
+                    )
+                    results.append(
+                        _to_result("cross_encoder", category, threads, batch_size, len(pairs), num_tokens, stats)
+                    )
+    finally:
+        torch.set_num_threads(initial_num_threads)
+
+    report = {
+        "timestamp": dt.now().isoformat(),
+        "embedding_model_id": embedding_model.model_id,
+        "cross_encoder_model_id": cross_encoder_model.model_id,
+        "backend": settings.RAG_MODEL_BACKEND,
+        "device": settings.RAG_MODEL_DEVICE,
+        "cpu_count": cpu_count,
+        # ru_maxrss is the all-time peak of the process, so it's only meaningful for the whole run.
+        "peak_rss_mb": _peak_rss_mb(),
+        "results": results,
+    }
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+    logger.info(f"Models benchmark results written to '{output_path}'.")
+
+    return report
+
+
+def _measure(fn: Callable[[list], object], inputs: list, batch_size: int) -> dict:
+    fn(inputs[:batch_size])  # Warm up.
+
+    latencies = []
+    start_time = time.perf_counter()
+    for i in range(0, len(inputs), batch_size):
+        batch = inputs[i : i + batch_size]
+        batch_start_time = time.perf_counter()
+        outputs = fn(batch)
+        latencies.append(time.perf_counter() - batch_start_time)
+
+        # A failing configuration must not be reported as a very fast one.
+        if len(outputs) != len(batch):
+            raise RuntimeError(f"Expected {len(batch)} outputs for a batch of size {batch_size}, got {len(outputs)}.")
+    total_time = time.perf_counter() - start_time
+
+    return {
+        "total_time": total_time,
+        "p50_latency_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_latency_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def _count_tokens(tokenizer, inputs: list, max_length: int) -> int:
+    if inputs and isinstance(inputs[0], tuple):
+        encoded = tokenizer(
+            [first for first, _ in inputs], [second for _, second in inputs], truncation=True, max_length=max_length
+        )
+    else:
+        encoded = tokenizer(inputs, truncation=True, max_length=max_length)
+
+    return sum(len(ids) for ids in encoded["input_ids"])
+
+
+def _to_result(
+    model: str, category: DataCategory, threads: int, batch_size: int, num_items: int, num_tokens: int, stats: dict
+) -> dict:
+    result = {
+        "model": model,
+        "data_category": str(category),
+        "num_threads": threads,
+        "batch_size": batch_size,
+        "items_per_second": num_items / stats["total_time"],
+        "tokens_per_second": num_tokens / stats["total_time"],
+        "p50_latency_ms": stats["p50_latency_ms"],
+        "p99_latency_ms": stats["p99_latency_ms"],
+    }
+    logger.info(f"Benchmark result: {result}")
+
+    return result
+
+
+def _peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from threading import Lock
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+
+class EmbeddingCache:
+    """
+    A persistent, content-addressed cache of embeddings for a single embedding model.
+
+    Embeddings are appended to a float32 matrix on disk that is read back through a memory map, while
+    an append-only index file maps the md5 hash of each input text to its row in the matrix.
+
+    The same model produces slightly different vectors with every inference backend, so the cache is namespaced by
+    the backend and, for the quantized backends, the quantization config.
+    """
+
+    def __init__(
+        self, cache_dir: str | Path, model_id: str, backend: str = "torch", quantization_config: str | None = None
+    ) -> None:
+        self._model_id = model_id
+        self._backend = backend
+        self._root_dir = Path(cache_dir) / self._get_namespace(model_id, backend, quantization_config)
+        self._vectors_path = self._root_dir / "vectors.f32"
+        self._index_path = self._root_dir / "index.txt"
+        self._meta_path = self._root_dir / "meta.json"
+
+        self._lock = Lock()
+        self._rows: dict[str, int] = {}
+        self._embedding_size: int | None = None
+        self._vectors: np.memmap | None = None
+
+        self._load()
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    @staticmethod
+    def _get_namespace(model_id: str, backend: str, quantization_config: str | None) -> str:
+        namespace = re.sub(r"[^\w.-]", "__", model_id)
+        # The torch caches keep their original location, as they were written before the other backends existed.
+        if backend != "torch":
+            namespace += f"__{backend}"
+            if quantization_config:
+                namespace += f"_{quantization_config}"
+
+        return namespace
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.md5(text.encode()).hexdigest()
+
+    def get_many(self, keys: list[str]) -> list[NDArray[np.float32] | None]:
+        with self._lock:
+            vectors = self._get_vectors()
+            if vectors is None:
+                return [None] * len(keys)
+
+            return [np.array(vectors[row]) if (row := self._rows.get(key)) is not None else None for key in keys]
+
+    def put_many(self, keys: list[str], embeddings: NDArray[np.float32]) -> None:
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        with self._lock:
+            if self._embedding_size is None:
+                self._embedding_size = embeddings.shape[1]
+                self._root_dir.mkdir(parents=True, exist_ok=True)
+                self._meta_path.write_text(
+                    json.dumps(
+                        {"model_id": self._model_id, "backend": self._backend, "embedding_size": self._embedding_size}
+                    )
+                )
+            elif embeddings.shape[1] != self._embedding_size:
+                raise ValueError(
+                    f"Embedding size mismatch for the '{self._model_id}' cache: "
+                    f"expected {self._embedding_size}, got {embeddings.shape[1]}."
+                )
+
+            new_keys, new_rows, seen_keys = [], [], set()
+            for i, key in enumerate(keys):
+                if key in self._rows or key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+
+            if len(new_keys) == 0:
+                return
+
+            with self._vectors_path.open("ab") as f:
+                f.write(embeddings[new_rows].tobytes())
+            with self._index_path.open("a") as f:
+                f.write("".join(f"{key}\n" for key in new_keys))
+
+            offset = len(self._rows)
+            for i, key in enumerate(new_keys):
+                self._rows[key] = offset + i
+            self._vectors = None
+
+    def encode(
+        self, texts: list[str], encoder: Callable[[list[str]], NDArray[np.float32]]
+    ) -> NDArray[np.float32]:
+        """
+        Returns the embeddings of the input texts, encoding only the texts missing from the cache.
+
+        Args:
+            texts (list[str]): The input texts to generate embeddings for.
+            encoder (Callable): Encodes a list of texts into a float32 matrix, used on cache misses.
+
+        Returns:
+            np.ndarray: The embeddings of the input texts, in the same order as the inputs.
+        """
+
+        if len(texts) == 0:
+            return np.empty((0, self._embedding_size or 0), dtype=np.float32)
+
+        keys = [self.content_hash(text) for text in texts]
+        embeddings = self.get_many(keys)
+
+        # Texts repeated in the batch are encoded and stored once, then copied to every position they appear at.
+        missing: dict[str, list[int]] = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(keys[i], []).append(i)
+        logger.debug(f"Embedding cache hits: {len(texts) - sum(map(len, missing.values()))}/{len(texts)}")
+        if len(missing) > 0:
+            new_embeddings = encoder([texts[positions[0]] for positions in missing.values()])
+            if len(new_embeddings) == 0:
+                return np.array([])
+
+            self.put_many(list(missing), new_embeddings)
+            for positions, embedding in zip(missing.values(), new_embeddings, strict=False):
+                for i in positions:
+                    embeddings[i] = embedding
+
+        return np.stack(embeddings)
+
+    def _load(self) -> None:
+        if not self._meta_path.exists() or not self._index_path.exists():
+            return
+
+        meta = json.loads(self._meta_path.read_text())
+        self._embedding_size = meta["embedding_size"]
+
+        row_size = 4 * self._embedding_size
+        keys = self._index_path.read_text().split()
+        num_rows = self._vectors_path.stat().st_size // row_size if self._vectors_path.exists() else 0
+
+        # A previous run might have been interrupted between the two writes, so keep both files aligned.
+        if num_rows != len(keys):
+            logger.warning(f"Embedding cache '{self._root_dir}' is inconsistent. Truncating it to the valid rows.")
+
+            keys = keys[: min(num_rows, len(keys))]
+            with self._vectors_path.open("ab") as f:
+                f.truncate(len(keys) * row_size)
+            self._index_path.write_text("".join(f"{key}\n" for key in keys))
+
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+        logger.info(f"Loaded {len(self._rows)} cached embeddings for {self._model_id=} from '{self._root_dir}'.")
+
+    def _get_vectors(self) -> np.memmap | None:
+        if len(self._rows) == 0:
+            return None
+
+        if self._vectors is None:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(len(self._rows), self._embedding_size)
+            )
+
+        return self._vectors
@@ -1,17 +1,20 @@
 from functools import cached_property
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
 from loguru import logger
 from numpy.typing import NDArray
-from sentence_transformers.SentenceTransformer import SentenceTransformer
-from sentence_transformers.cross_encoder import CrossEncoder
-from transformers import AutoTokenizer
 
+from llm_engineering.infrastructure.metrics import model_call_seconds
 from llm_engineering.settings import settings
 
+from .backends import load_cross_encoder, load_sentence_transformer
 from .base import SingletonMeta
+from .batching import encode_length_bucketed
+
+if TYPE_CHECKING:
+    from transformers import AutoTokenizer
 
 
 class EmbeddingModelSingleton(metaclass=SingletonMeta):
@@ -21,17 +24,22 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
     def __init__(
         self,
-        model_id: str = settings.TEXT_EMBEDDING_MODEL_ID,
-        device: str = settings.RAG_MODEL_DEVICE,
+        model_id: Optional[str] = None,
+        device: Optional[str] = None,
         cache_dir: Optional[Path] = None,
+        batch_token_budget: Optional[int] = None,
+        backend: Optional[str] = None,
     ) -> None:
-        self._model_id = model_id
-        self._device = device
+        self._model_id = model_id or settings.TEXT_EMBEDDING_MODEL_ID
+        self._device = device or settings.RAG_MODEL_DEVICE
+        self._batch_token_budget = batch_token_budget or settings.EMBEDDING_BATCH_TOKEN_BUDGET
+        self._backend = backend or settings.RAG_MODEL_BACKEND
 
-        self._model = SentenceTransformer(
+        self._model = load_sentence_transformer(
             self._model_id,
             device=self._device,
-            cache_folder=str(cache_dir) if cache_dir else None,
+            backend=self._backend,
+            cache_dir=cache_dir,
         )
         self._model.eval()
 
@@ -46,6 +54,17 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
         return self._model_id
 
+    @property
+    def backend(self) -> str:
+        """
+        Returns the inference backend the model runs on.
+
+        Returns:
+            str: One of 'torch', 'onnx' or 'onnx-int8'.
+        """
+
+        return self._backend
+
     @cached_property
     def embedding_size(self) -> int:
         """
@@ -71,7 +90,7 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
         return self._model.max_seq_length
 
     @property
-    def tokenizer(self) -> AutoTokenizer:
+    def tokenizer(self) -> "AutoTokenizer":
         """
         Returns the tokenizer used to tokenize input text.
 
@@ -87,8 +106,11 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
         """
         Generates embeddings for the input text using the pre-trained transformer model.
 
+        Lists are encoded in length-sorted, token-budgeted batches to minimize padding, and the embeddings are
+        returned in the same order as the inputs.
+
         Args:
-            input_text (str): The input text to generate embeddings for.
+            input_text (str | list[str]): The input text to generate embeddings for.
             to_list (bool): Whether to return the embeddings as a list or numpy array. Defaults to True.
 
         Returns:
@@ -96,7 +118,13 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
         """
 
         try:
-            embeddings = self._model.encode(input_text)
+            with model_call_seconds.time(model=self._model_id):
+                if isinstance(input_text, str):
+                    embeddings = self._model.encode(input_text)
+                else:
+                    embeddings = encode_length_bucketed(
+                        self._model, input_text, token_budget=self._batch_token_budget
+                    )
         except Exception:
             logger.error(f"Error generating embeddings for {self._model_id=} and {input_text=}")
 
@@ -111,24 +139,51 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 class CrossEncoderModelSingleton(metaclass=SingletonMeta):
     def __init__(
         self,
-        model_id: str = settings.RERANKING_CROSS_ENCODER_MODEL_ID,
-        device: str = settings.RAG_MODEL_DEVICE,
+        model_id: Optional[str] = None,
+        device: Optional[str] = None,
+        backend: Optional[str] = None,
     ) -> None:
         """
         A singleton class that provides a pre-trained cross-encoder model for scoring pairs of input text.
         """
 
-        self._model_id = model_id
-        self._device = device
+        self._model_id = model_id or settings.RERANKING_CROSS_ENCODER_MODEL_ID
+        self._device = device or settings.RAG_MODEL_DEVICE
+        self._backend = backend or settings.RAG_MODEL_BACKEND
 
-        self._model = CrossEncoder(
-            model_name=self._model_id,
+        self._model = load_cross_encoder(
+            self._model_id,
             device=self._device,
+            backend=self._backend,
         )
-        self._model.model.eval()
+        if self._backend == "torch":
+            self._model.model.eval()
+
+    @property
+    def model_id(self) -> str:
+        """
+        Returns the identifier of the pre-trained cross-encoder model to use.
+
+        Returns:
+            str: The identifier of the pre-trained cross-encoder model to use.
+        """
+
+        return self._model_id
+
+    @property
+    def tokenizer(self) -> "AutoTokenizer":
+        """
+        Returns the tokenizer used to tokenize the input pairs.
+
+        Returns:
+            AutoTokenizer: The tokenizer used to tokenize the input pairs.
+        """
+
+        return self._model.tokenizer
 
     def __call__(self, pairs: list[tuple[str, str]], to_list: bool = True) -> NDArray[np.float32] | list[float]:
-        scores = self._model.predict(pairs)
+        with model_call_seconds.time(model=self._model_id):
+            scores = self._model.predict(pairs)
 
         if to_list:
             scores = scores.tolist()
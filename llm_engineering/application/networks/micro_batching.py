@@ -0,0 +1,99 @@
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent encoding requests into a single batched model call.
+
+    Callers submit texts from any thread and block on futures, while a background thread gathers the pending texts
+    for at most `max_wait_ms` (or until `max_batch_size` texts are queued), encodes them in one call and resolves
+    the futures of every caller. Texts submitted together as a group are never split across model calls.
+    """
+
+    def __init__(
+        self,
+        encoder: Callable[[list[str]], NDArray[np.float32]],
+        embedding_size: int,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 3.0,
+    ) -> None:
+        self._encoder = encoder
+        self._embedding_size = embedding_size
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+
+        self._queue: queue.Queue[tuple[list[str], Future, bool]] = queue.Queue()
+        self._lock = Lock()
+        self._thread: Thread | None = None
+
+    def submit(self, input_text: str) -> Future:
+        """Submits a single text. The future resolves to its embedding."""
+
+        return self._put([input_text], is_group=False)
+
+    def submit_many(self, input_text: list[str]) -> Future:
+        """Submits a group of texts encoded in the same model call. The future resolves to their embedding matrix."""
+
+        return self._put(input_text, is_group=True)
+
+    def __call__(self, input_text: list[str]) -> NDArray[np.float32]:
+        if len(input_text) == 0:
+            return np.empty((0, self._embedding_size), dtype=np.float32)
+
+        return self.submit_many(input_text).result()
+
+    def _put(self, input_text: list[str], is_group: bool) -> Future:
+        self._ensure_started()
+
+        future = Future()
+        self._queue.put((input_text, future, is_group))
+
+        return future
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            num_texts = len(batch[0][0])
+
+            deadline = time.monotonic() + self._max_wait
+            while num_texts < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                num_texts += len(batch[-1][0])
+
+            try:
+                embeddings = self._encoder([text for texts, _, _ in batch for text in texts])
+                if len(embeddings) != num_texts:
+                    raise RuntimeError(f"Expected {num_texts} embeddings, got {len(embeddings)}.")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+                continue
+
+            start = 0
+            for texts, future, is_group in batch:
+                end = start + len(texts)
+                future.set_result(embeddings[start:end] if is_group else embeddings[start])
+                start = end
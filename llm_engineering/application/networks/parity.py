@@ -0,0 +1,80 @@
+import numpy as np
+from loguru import logger
+
+from llm_engineering.settings import settings
+
+from .backends import load_cross_encoder, load_sentence_transformer
+
+DEFAULT_PARITY_QUERIES = [
+    "What are the best types of advanced RAG methods?",
+    "How do I fine-tune an LLM with LoRA on a single GPU?",
+    "Explain how vector databases index embeddings.",
+]
+
+DEFAULT_PARITY_DOCUMENTS = [
+    "Query expansion and self-querying improve the recall of retrieval-augmented generation systems.",
+    "Reranking the retrieved chunks with a cross-encoder refines their order based on query relevance.",
+    "LoRA freezes the pre-trained weights and trains low-rank adapters, which drastically reduces memory usage.",
+    "Qdrant stores vectors in an HNSW graph, which allows approximate nearest neighbour search in logarithmic time.",
+    "def chunk_text(text: str, chunk_size: int = 500) -> list[str]: ...",
+    "The weather was nice, so we went for a walk in the park.",
+]
+
+
+def check_backend_parity(
+    backend: str | None = None,
+    queries: list[str] | None = None,
+    documents: list[str] | None = None,
+) -> dict:
+    """
+    Compares the outputs of the embedding and cross-encoder models served by a backend against the PyTorch reference.
+
+    Args:
+        backend (str, optional): The backend to check, e.g. 'onnx-int8'. Defaults to the RAG_MODEL_BACKEND setting.
+        queries (list[str], optional): The queries used to score the cross-encoder pairs.
+        documents (list[str], optional): The documents to embed and to pair with every query.
+
+    Returns:
+        dict: The embedding cosine similarity and the cross-encoder score drift against the PyTorch models.
+    """
+
+    backend = backend or settings.RAG_MODEL_BACKEND
+    queries = queries or DEFAULT_PARITY_QUERIES
+    documents = documents or DEFAULT_PARITY_DOCUMENTS
+    device = settings.RAG_MODEL_DEVICE
+
+    embedding_model_id = settings.TEXT_EMBEDDING_MODEL_ID
+    reference_embeddings = load_sentence_transformer(embedding_model_id, device, backend="torch").encode(documents)
+    candidate_embeddings = load_sentence_transformer(embedding_model_id, device, backend=backend).encode(documents)
+    cosine = np.sum(reference_embeddings * candidate_embeddings, axis=1) / (
+        np.linalg.norm(reference_embeddings, axis=1) * np.linalg.norm(candidate_embeddings, axis=1)
+    )
+
+    cross_encoder_model_id = settings.RERANKING_CROSS_ENCODER_MODEL_ID
+    pairs = [(query, document) for query in queries for document in documents]
+    reference_scores = load_cross_encoder(cross_encoder_model_id, device, backend="torch").predict(pairs)
+    candidate_scores = load_cross_encoder(cross_encoder_model_id, device, backend=backend).predict(pairs)
+    score_drift = np.abs(reference_scores - candidate_scores)
+
+    # The ranking of the documents for every query is what the reranker actually consumes.
+    reference_ranking = np.argsort(-reference_scores.reshape(len(queries), len(documents)), axis=1)
+    candidate_ranking = np.argsort(-candidate_scores.reshape(len(queries), len(documents)), axis=1)
+
+    report = {
+        "backend": backend,
+        "embedding": {
+            "model_id": embedding_model_id,
+            "min_cosine_similarity": float(cosine.min()),
+            "mean_cosine_similarity": float(cosine.mean()),
+        },
+        "cross_encoder": {
+            "model_id": cross_encoder_model_id,
+            "max_abs_score_drift": float(score_drift.max()),
+            "mean_abs_score_drift": float(score_drift.mean()),
+            "top_1_agreement": float(np.mean(reference_ranking[:, 0] == candidate_ranking[:, 0])),
+            "full_ranking_agreement": float(np.mean(np.all(reference_ranking == candidate_ranking, axis=1))),
+        },
+    }
+    logger.info(f"Backend parity report: {report}")
+
+    return report
@@ -0,0 +1,217 @@
+import atexit
+import math
+import multiprocessing as mp
+import os
+import queue
+from multiprocessing import shared_memory
+from threading import Lock
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from llm_engineering.settings import settings
+
+from .backends import load_sentence_transformer
+from .base import SingletonMeta
+from .batching import encode_length_bucketed
+
+
+def _encode_worker(
+    model_id: str,
+    device: str,
+    backend: str,
+    batch_token_budget: int,
+    num_threads: int,
+    task_queue: mp.Queue,
+    result_queue: mp.Queue,
+) -> None:
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+    try:
+        model = load_sentence_transformer(model_id, device=device, backend=backend)
+        model.eval()
+    except Exception as e:
+        result_queue.put(("error", repr(e)))
+
+        return
+    result_queue.put(("ready", model.get_sentence_embedding_dimension()))
+
+    while (task := task_queue.get()) is not None:
+        shm_name, shape, offset, input_text = task
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+                output[offset : offset + len(input_text)] = encode_length_bucketed(
+                    model, input_text, token_budget=batch_token_budget
+                )
+                del output
+            finally:
+                shm.close()
+
+            result_queue.put(("done", offset))
+        except Exception as e:
+            result_queue.put(("error", repr(e)))
+
+
+class EmbeddingProcessPool(metaclass=SingletonMeta):
+    """
+    A singleton pool of worker processes, each holding its own copy of the embedding model.
+
+    Inputs are split into length-sorted slices that are sent to the workers, which write their embeddings directly
+    into a shared-memory output matrix, so no embeddings are pickled between processes.
+    """
+
+    def __init__(
+        self,
+        model_id: str | None = None,
+        device: str | None = None,
+        num_workers: int | None = None,
+        batch_token_budget: int | None = None,
+        backend: str | None = None,
+    ) -> None:
+        self._model_id = model_id or settings.TEXT_EMBEDDING_MODEL_ID
+        self._device = device or settings.RAG_MODEL_DEVICE
+        self._backend = backend or settings.RAG_MODEL_BACKEND
+        self._num_workers = max(num_workers or settings.EMBEDDING_NUM_WORKERS, 1)
+        self._batch_token_budget = batch_token_budget or settings.EMBEDDING_BATCH_TOKEN_BUDGET
+
+        self._lock = Lock()
+        self._processes: list[mp.Process] = []
+        self._task_queue: mp.Queue | None = None
+        self._result_queue: mp.Queue | None = None
+        self._embedding_size: int | None = None
+
+        # Registered once, as the pool may be closed and restarted many times.
+        atexit.register(self.close)
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    @property
+    def num_workers(self) -> int:
+        return self._num_workers
+
+    def __call__(self, input_text: list[str], to_list: bool = True) -> NDArray[np.float32] | list[list[float]]:
+        """
+        Generates embeddings for the input texts by spreading them across the worker processes.
+
+        Args:
+            input_text (list[str]): The input texts to generate embeddings for.
+            to_list (bool): Whether to return the embeddings as a list or numpy array. Defaults to True.
+
+        Returns:
+            Union[np.ndarray, list]: The embeddings generated for the input texts, in the input order.
+        """
+
+        with self._lock:
+            try:
+                self._start()
+                embeddings = self._encode(input_text)
+            except Exception:
+                logger.exception(f"Error generating embeddings in the process pool for {self._model_id=}")
+                # Restart the workers on the next call, so no results of the failed call leak into it.
+                self.close()
+
+                return [] if to_list else np.array([])
+
+        if to_list:
+            embeddings = embeddings.tolist()
+
+        return embeddings
+
+    def _encode(self, input_text: list[str]) -> NDArray[np.float32]:
+        shape = (len(input_text), self._embedding_size)
+        if len(input_text) == 0:
+            return np.empty(shape, dtype=np.float32)
+
+        # Give every worker slices of similar lengths, so the padding inside each slice stays low.
+        order = sorted(range(len(input_text)), key=lambda i: len(input_text[i]))
+        sorted_text = [input_text[i] for i in order]
+        slice_size = math.ceil(len(sorted_text) / (2 * self._num_workers))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * 4, 1))
+        try:
+            num_tasks = 0
+            for offset in range(0, len(sorted_text), slice_size):
+                self._task_queue.put((shm.name, shape, offset, sorted_text[offset : offset + slice_size]))
+                num_tasks += 1
+
+            for _ in range(num_tasks):
+                status, value = self._get_result()
+                if status == "error":
+                    raise RuntimeError(f"Embedding worker failed: {value}")
+
+            embeddings = np.empty(shape, dtype=np.float32)
+            embeddings[order] = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return embeddings
+
+    def _start(self) -> None:
+        if self._processes:
+            return
+
+        logger.info(f"Starting {self._num_workers} embedding worker processes for {self._model_id=}.")
+
+        context = mp.get_context("spawn")
+        self._task_queue = context.Queue()
+        self._result_queue = context.Queue()
+        num_threads = max((os.cpu_count() or 1) // self._num_workers, 1)
+        self._processes = [
+            context.Process(
+                target=_encode_worker,
+                args=(
+                    self._model_id,
+                    self._device,
+                    self._backend,
+                    self._batch_token_budget,
+                    num_threads,
+                    self._task_queue,
+                    self._result_queue,
+                ),
+                daemon=True,
+            )
+            for _ in range(self._num_workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        for _ in self._processes:
+            status, value = self._get_result()
+            if status == "error":
+                self.close()
+
+                raise RuntimeError(f"Embedding worker failed to load the model: {value}")
+            self._embedding_size = value
+
+    def _get_result(self) -> tuple[str, int | str]:
+        while True:
+            try:
+                return self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    raise RuntimeError("An embedding worker process died unexpectedly.") from None
+
+    def close(self) -> None:
+        """
+        Stops the worker processes. The pool is restarted on the next call.
+        """
+
+        if not self._processes:
+            return
+
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        self._processes = []
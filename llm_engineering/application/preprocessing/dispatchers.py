@@ -2,6 +2,7 @@ from loguru import logger
 
 from llm_engineering.domain.base import NoSQLBaseDocument, VectorBaseDocument
 from llm_engineering.domain.types import DataCategory
+from llm_engineering.settings import settings
 
 from .chunking_data_handlers import (
     ArticleChunkingHandler,
@@ -121,7 +122,10 @@ class EmbeddingDispatcher:
         ), "Data models must be of the same category."
         handler = cls.factory.create_handler(data_category)
 
-        embedded_chunk_model = handler.embed_batch(data_model)
+        use_process_pool = (
+            settings.EMBEDDING_NUM_WORKERS > 1 and len(data_model) >= settings.EMBEDDING_POOL_MIN_BATCH_SIZE
+        )
+        embedded_chunk_model = handler.embed_batch(data_model, use_process_pool=use_process_pool)
 
         if not is_list:
             embedded_chunk_model = embedded_chunk_model[0]
@@ -1,7 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, cast
+from functools import cache
+from typing import Generic, TypeVar
 
-from llm_engineering.application.networks import EmbeddingModelSingleton
+import numpy as np
+from numpy.typing import NDArray
+
+from llm_engineering.application.networks import (
+    EmbeddingCache,
+    EmbeddingModelSingleton,
+    EmbeddingProcessPool,
+    MicroBatcher,
+)
 from llm_engineering.domain.chunks import ArticleChunk, Chunk, PostChunk, RepositoryChunk
 from llm_engineering.domain.embedded_chunks import (
     EmbeddedArticleChunk,
@@ -9,13 +18,44 @@ from llm_engineering.domain.embedded_chunks import (
     EmbeddedPostChunk,
     EmbeddedRepositoryChunk,
 )
-
 from llm_engineering.domain.queries import EmbeddedQuery, Query
+from llm_engineering.infrastructure.lazy import LazyObject
+from llm_engineering.settings import settings
+
+from .operations import bm25_document_vectors
 
 ChunkT = TypeVar("ChunkT", bound=Chunk)
 EmbeddedChunkT = TypeVar("EmbeddedChunkT", bound=EmbeddedChunk)
 
-embedding_model = EmbeddingModelSingleton()
+embedding_model: EmbeddingModelSingleton = LazyObject(EmbeddingModelSingleton)  # type: ignore[assignment]
+
+
+@cache
+def get_embedding_cache() -> EmbeddingCache | None:
+    if not settings.USE_EMBEDDING_CACHE:
+        return None
+
+    backend = embedding_model.backend
+
+    return EmbeddingCache(
+        cache_dir=settings.EMBEDDING_CACHE_DIR,
+        model_id=embedding_model.model_id,
+        backend=backend,
+        quantization_config=settings.RAG_ONNX_QUANTIZATION_CONFIG if backend == "onnx-int8" else None,
+    )
+
+
+@cache
+def get_query_batcher() -> MicroBatcher | None:
+    if not settings.EMBEDDING_MICRO_BATCH_ENABLED:
+        return None
+
+    return MicroBatcher(
+        encoder=lambda texts: embedding_model(texts, to_list=False),
+        embedding_size=embedding_model.embedding_size,
+        max_batch_size=settings.EMBEDDING_MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBEDDING_MICRO_BATCH_MAX_WAIT_MS,
+    )
 
 
 class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
@@ -24,44 +64,78 @@ class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
     All data transformations logic for the embedding step is done here
     """
 
+    embedded_model: type[EmbeddedChunkT]
+    use_cache: bool = True
+
     def embed(self, data_model: ChunkT) -> EmbeddedChunkT:
         return self.embed_batch([data_model])[0]
 
-    def embed_batch(self, data_model: list[ChunkT]) -> list[EmbeddedChunkT]:
+    def embed_batch(self, data_model: list[ChunkT], use_process_pool: bool = False) -> list[EmbeddedChunkT]:
         embedding_model_input = [data_model.content for data_model in data_model]
-        embeddings = embedding_model(embedding_model_input, to_list=True)
+        embeddings = self._encode(embedding_model_input, use_process_pool=use_process_pool)
+        if len(embeddings) > 0:
+            embeddings = self.embedded_model.project_vectors(embeddings)
 
+        # Every embedding is a row view into the same float32 matrix, so no per-dimension Python objects are created.
         embedded_chunk = [
-            self.map_model(data_model, cast(list[float], embedding))
-            for data_model, embedding in zip(data_model, embeddings, strict=False)
+            self.map_model(data_model, embedding) for data_model, embedding in zip(data_model, embeddings, strict=False)
         ]
 
+        if self.embedded_model.get_use_sparse_index():
+            # The BM25 length normalization uses the average chunk length of the batch.
+            sparse_embeddings = bm25_document_vectors(embedding_model_input)
+            for embedded, sparse_embedding in zip(embedded_chunk, sparse_embeddings, strict=False):
+                embedded.sparse_embedding = sparse_embedding
+
         return embedded_chunk
 
+    def _encode(self, input_text: list[str], use_process_pool: bool = False) -> NDArray[np.float32]:
+        encoder = EmbeddingProcessPool() if use_process_pool else embedding_model
+
+        embedding_cache = get_embedding_cache() if self.use_cache else None
+        if embedding_cache is not None:
+            return embedding_cache.encode(input_text, encoder=lambda texts: encoder(texts, to_list=False))
+
+        return encoder(input_text, to_list=False)
+
     @abstractmethod
-    def map_model(self, data_model: ChunkT, embedding: list[float]) -> EmbeddedChunkT:
+    def map_model(self, data_model: ChunkT, embedding: NDArray[np.float32]) -> EmbeddedChunkT:
         pass
 
 
 class QueryEmbeddingHandler(EmbeddingDataHandler):
-    def map_model(self, data_model: Query, embedding: list[float]) -> EmbeddedQuery:
+    # Queries are projected per collection at search time instead, as every collection may store a different size.
+    embedded_model = EmbeddedQuery
+    # Queries are short, rarely repeat verbatim and are embedded by the API, so they skip the on-disk cache.
+    use_cache = False
+
+    def _encode(self, input_text: list[str], use_process_pool: bool = False) -> NDArray[np.float32]:
+        # Queries are embedded concurrently by the API, so coalesce them into shared forward passes.
+        query_batcher = get_query_batcher()
+        if query_batcher is not None:
+            return query_batcher(input_text)
+
+        return super()._encode(input_text, use_process_pool=use_process_pool)
+
+    def map_model(self, data_model: Query, embedding: NDArray[np.float32]) -> EmbeddedQuery:
         return EmbeddedQuery(
             id=data_model.id,
             author_id=data_model.author_id,
             author_full_name=data_model.author_full_name,
             content=data_model.content,
-            embedding=embedding,
+            embedding=embedding.tolist(),
             metadata={
                 "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
+                "embedding_size": len(embedding),
                 "max_input_length": embedding_model.max_input_length,
             },
         )
 
 
-
 class PostEmbeddingHandler(EmbeddingDataHandler):
-    def map_model(self, data_model: PostChunk, embedding: list[float]) -> EmbeddedPostChunk:
+    embedded_model = EmbeddedPostChunk
+
+    def map_model(self, data_model: PostChunk, embedding: NDArray[np.float32]) -> EmbeddedPostChunk:
         return EmbeddedPostChunk(
             id=data_model.id,
             content=data_model.content,
@@ -72,14 +146,16 @@ class PostEmbeddingHandler(EmbeddingDataHandler):
             author_full_name=data_model.author_full_name,
             metadata={
                 "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
+                "embedding_size": len(embedding),
                 "max_input_length": embedding_model.max_input_length,
             },
         )
 
 
 class ArticleEmbeddingHandler(EmbeddingDataHandler):
-    def map_model(self, data_model: ArticleChunk, embedding: list[float]) -> EmbeddedArticleChunk:
+    embedded_model = EmbeddedArticleChunk
+
+    def map_model(self, data_model: ArticleChunk, embedding: NDArray[np.float32]) -> EmbeddedArticleChunk:
         return EmbeddedArticleChunk(
             id=data_model.id,
             content=data_model.content,
@@ -91,14 +167,16 @@ class ArticleEmbeddingHandler(EmbeddingDataHandler):
             author_full_name=data_model.author_full_name,
             metadata={
                 "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
+                "embedding_size": len(embedding),
                 "max_input_length": embedding_model.max_input_length,
             },
         )
 
 
 class RepositoryEmbeddingHandler(EmbeddingDataHandler):
-    def map_model(self, data_model: RepositoryChunk, embedding: list[float]) -> EmbeddedRepositoryChunk:
+    embedded_model = EmbeddedRepositoryChunk
+
+    def map_model(self, data_model: RepositoryChunk, embedding: NDArray[np.float32]) -> EmbeddedRepositoryChunk:
         return EmbeddedRepositoryChunk(
             id=data_model.id,
             content=data_model.content,
@@ -111,7 +189,7 @@ class RepositoryEmbeddingHandler(EmbeddingDataHandler):
             author_full_name=data_model.author_full_name,
             metadata={
                 "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
+                "embedding_size": len(embedding),
                 "max_input_length": embedding_model.max_input_length,
             },
         )
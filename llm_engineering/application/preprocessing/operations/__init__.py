@@ -1,7 +1,10 @@
+from .bm25 import bm25_document_vectors, bm25_query_vector
 from .chunking import chunk_article, chunk_text
 from .cleaning import clean_text
 
 __all__ = [
+    "bm25_document_vectors",
+    "bm25_query_vector",
     "chunk_article",
     "chunk_text",
     "clean_text",
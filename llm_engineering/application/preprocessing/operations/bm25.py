@@ -0,0 +1,51 @@
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+from llm_engineering.settings import settings
+
+# Keeps identifiers such as "snake_case", "k8s" or "gpt-4o" as single tokens, so exact technical terms can match.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[_\-.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def term_index(token: str) -> int:
+    # A stable hash, so the documents and the queries share the same sparse index space across processes.
+    return zlib.crc32(token.encode())
+
+
+def bm25_document_vectors(texts: list[str], k1: float | None = None, b: float | None = None) -> list[SparseVector]:
+    """
+    Computes the BM25 term-frequency weights of every document.
+
+    The IDF part of BM25 is applied by Qdrant at search time (the sparse vectors use the IDF modifier), so it always
+    reflects the current collection. The average document length is computed over the given batch.
+    """
+
+    k1 = k1 if k1 is not None else settings.BM25_K1
+    b = b if b is not None else settings.BM25_B
+
+    tokenized_texts = [tokenize(text) for text in texts]
+    avgdl = sum(len(tokens) for tokens in tokenized_texts) / max(len(tokenized_texts), 1)
+
+    vectors = []
+    for tokens in tokenized_texts:
+        length_norm = k1 * (1 - b + b * len(tokens) / avgdl) if avgdl > 0 else k1
+        weights = {}
+        for token, tf in Counter(tokens).items():
+            index = term_index(token)
+            weights[index] = weights.get(index, 0.0) + tf * (k1 + 1) / (tf + length_norm)
+        vectors.append(SparseVector(indices=list(weights.keys()), values=list(weights.values())))
+
+    return vectors
+
+
+def bm25_query_vector(text: str) -> SparseVector:
+    indices = sorted({term_index(token) for token in tokenize(text)})
+
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
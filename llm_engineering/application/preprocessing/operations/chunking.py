@@ -4,10 +4,10 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter, SentenceTran
 
 from llm_engineering.application.networks import EmbeddingModelSingleton
 
-embedding_model = EmbeddingModelSingleton()
-
 
 def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> list[str]:
+    embedding_model = EmbeddingModelSingleton()
+
     character_splitter = RecursiveCharacterTextSplitter(separators=["\n\n"], chunk_size=chunk_size, chunk_overlap=0)
     text_split_by_characters = character_splitter.split_text(text)
 
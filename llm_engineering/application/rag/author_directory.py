@@ -0,0 +1,153 @@
+import difflib
+import re
+import threading
+import time
+import unicodedata
+from functools import cache
+
+from loguru import logger
+
+from llm_engineering.domain.documents import UserDocument
+from llm_engineering.settings import settings
+
+
+class AuthorDirectory:
+    """
+    An in-memory index of the users, used to resolve the author of a query without querying MongoDB.
+
+    The users are loaded from the `users` collection and reloaded every `refresh_interval` seconds, or right away
+    after `invalidate()`. Names are resolved exactly, then case and accent insensitively, then by a unique first or
+    last name, and finally fuzzily, so misspelled names still map to an existing author. A gazetteer regex of all the
+    full names resolves the authors mentioned verbatim in a query, which skips the LLM call entirely.
+
+    Args:
+        refresh_interval (float): The number of seconds the users are cached for.
+        fuzzy_cutoff (float): The minimum difflib similarity ratio of a fuzzy match, between 0 and 1.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0, fuzzy_cutoff: float = 0.85) -> None:
+        self.refresh_interval = refresh_interval
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._lock = threading.Lock()
+        self._loaded_at = float("-inf")
+        self._by_id: dict[str, UserDocument] = {}
+        self._by_full_name: dict[str, UserDocument] = {}
+        self._by_normalized_name: dict[str, UserDocument] = {}
+        self._by_name_token: dict[str, list[UserDocument]] = {}
+        self._gazetteer: re.Pattern | None = None
+
+    def __len__(self) -> int:
+        self._refresh_if_stale()
+
+        return len(self._by_id)
+
+    def find(self, name_or_id: str) -> UserDocument | None:
+        """
+        Resolves a user from its id or full name.
+
+        Args:
+            name_or_id (str): The id or the (possibly misspelled) full name of the user.
+
+        Returns:
+            UserDocument | None: The resolved user, or None if no user matches.
+        """
+
+        self._refresh_if_stale()
+
+        name_or_id = name_or_id.strip()
+        if user := self._by_id.get(name_or_id) or self._by_full_name.get(name_or_id):
+            return user
+
+        normalized_name = self.normalize(name_or_id)
+        if user := self._by_normalized_name.get(normalized_name):
+            return user
+
+        name_tokens = normalized_name.split()
+        if len(name_tokens) == 1 and len(users := self._by_name_token.get(name_tokens[0], [])) == 1:
+            return users[0]
+
+        close_matches = difflib.get_close_matches(
+            normalized_name, self._by_normalized_name.keys(), n=1, cutoff=self.fuzzy_cutoff
+        )
+        if close_matches:
+            user = self._by_normalized_name[close_matches[0]]
+            logger.info(f"Resolved the author name '{name_or_id}' to '{user.full_name}' by fuzzy matching.")
+
+            return user
+
+        return None
+
+    def match_query(self, text: str) -> UserDocument | None:
+        """
+        Resolves the author whose full name is mentioned verbatim in the query text.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            UserDocument | None: The mentioned user, or None if no author or more than one author is mentioned.
+        """
+
+        self._refresh_if_stale()
+
+        if self._gazetteer is None:
+            return None
+
+        matched_names = {match.group(0) for match in self._gazetteer.finditer(self.normalize(text))}
+        if len(matched_names) != 1:
+            return None
+
+        return self._by_normalized_name[matched_names.pop()]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = float("-inf")
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+
+        return " ".join(name.lower().split())
+
+    def _refresh_if_stale(self) -> None:
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+
+            self._load(UserDocument.bulk_find())
+            self._loaded_at = time.monotonic()
+
+    def _load(self, users: list[UserDocument]) -> None:
+        by_name_token: dict[str, list[UserDocument]] = {}
+        for user in users:
+            for token in {*self.normalize(user.first_name).split(), *self.normalize(user.last_name).split()}:
+                by_name_token.setdefault(token, []).append(user)
+
+        by_normalized_name = {self.normalize(user.full_name): user for user in users}
+        if by_normalized_name:
+            # The longest names first, so "Paul Iusztin Jr" wins over "Paul Iusztin".
+            names = sorted(by_normalized_name, key=len, reverse=True)
+            gazetteer = re.compile(r"\b(?:" + "|".join(re.escape(name) for name in names) + r")\b")
+        else:
+            gazetteer = None
+
+        self._by_id = {str(user.id): user for user in users}
+        self._by_full_name = {user.full_name: user for user in users}
+        self._by_normalized_name = by_normalized_name
+        self._by_name_token = by_name_token
+        self._gazetteer = gazetteer
+
+        logger.info(f"Loaded {len(users)} users into the author directory.")
+
+
+@cache
+def get_author_directory() -> AuthorDirectory:
+    # Shared by all the SelfQuery instances, as the API creates a new retriever for every request.
+    return AuthorDirectory(
+        refresh_interval=settings.AUTHOR_DIRECTORY_REFRESH_SECONDS,
+        fuzzy_cutoff=settings.AUTHOR_DIRECTORY_FUZZY_CUTOFF,
+    )
@@ -5,6 +5,7 @@ from langchain.prompts import PromptTemplate
 from pydantic import BaseModel
 
 from llm_engineering.domain.queries import Query
+from llm_engineering.infrastructure.opik_utils import configure_opik
 
 
 class PromptTemplateFactory(ABC, BaseModel):
@@ -17,6 +18,8 @@ class RAGStep(ABC):
     def __init__(self, mock: bool = False) -> None:
         self._mock = mock
 
+        configure_opik()
+
     @abstractmethod
     def generate(self, query: Query, *args, **kwargs) -> Any:
         pass
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from functools import cache
+from pathlib import Path
+
+from loguru import logger
+
+from llm_engineering.application.utils import LRUCache
+from llm_engineering.settings import settings
+
+
+class QueryExpansionCache:
+    """
+    Caches the queries generated by QueryExpansion, which are deterministic at temperature 0.
+
+    Entries are keyed by the normalized query text, the number of queries to generate, the LLM and a hash of the
+    prompt template, so changing any of them never serves stale expansions. Lookups go through an in-memory LRU
+    first, then through a SQLite database on the local disk, which persists the expansions across restarts and shares
+    them between the API workers of the same host.
+
+    Args:
+        db_path (str | Path): The path of the SQLite database.
+        maxsize (int): The maximum number of entries kept in memory.
+    """
+
+    def __init__(self, db_path: str | Path, maxsize: int = 10_000) -> None:
+        self.db_path = Path(db_path)
+
+        self._memory_cache: LRUCache[str, list[str]] = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize("NFKC", text).casefold()
+
+        return " ".join(text.split()).rstrip("?!. ")
+
+    @classmethod
+    def make_key(cls, query: str, expand_to_n: int, model_id: str, prompt: str) -> str:
+        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
+
+        return hashlib.sha256(
+            json.dumps([cls.normalize(query), expand_to_n, model_id, prompt_hash]).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> list[str] | None:
+        expansions = self._memory_cache.get(key)
+        if expansions is not None:
+            return expansions
+
+        try:
+            with self._lock:
+                row = self._get_connection().execute(
+                    "SELECT expansions FROM query_expansions WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Failed to read from the query expansion cache.")
+
+            return None
+
+        if row is None:
+            return None
+
+        expansions = json.loads(row[0])
+        self._memory_cache.set(key, expansions)
+
+        return expansions
+
+    def set(self, key: str, expansions: list[str]) -> None:
+        self._memory_cache.set(key, expansions)
+
+        try:
+            with self._lock:
+                connection = self._get_connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO query_expansions (key, expansions, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(expansions), time.time()),
+                )
+                connection.commit()
+        except sqlite3.Error:
+            logger.exception("Failed to write to the query expansion cache.")
+
+    def clear(self) -> None:
+        self._memory_cache.clear()
+
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM query_expansions")
+            connection.commit()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # The connection is shared by the threads of a worker, serialized by the lock. The WAL journal lets the
+            # other workers read while one of them writes.
+            connection = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS query_expansions (key TEXT PRIMARY KEY, expansions TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+
+@cache
+def get_query_expansion_cache() -> QueryExpansionCache | None:
+    if not settings.QUERY_EXPANSION_CACHE_ENABLED:
+        return None
+
+    return QueryExpansionCache(
+        db_path=settings.QUERY_EXPANSION_CACHE_PATH, maxsize=settings.QUERY_EXPANSION_CACHE_MAX_SIZE
+    )
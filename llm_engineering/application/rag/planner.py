@@ -0,0 +1,115 @@
+import threading
+import time
+from functools import cache
+
+from loguru import logger
+from qdrant_client.http import exceptions
+
+from llm_engineering.domain.embedded_chunks import (
+    EmbeddedArticleChunk,
+    EmbeddedChunk,
+    EmbeddedPostChunk,
+    EmbeddedRepositoryChunk,
+)
+from llm_engineering.domain.exceptions import ImproperlyConfigured
+from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.settings import settings
+
+SUPPORTED_STRATEGIES = ("static", "proportional")
+
+
+class RetrievalPlanner:
+    """
+    Allocates the candidate budget of a search across the embedded chunk collections.
+
+    With the 'static' strategy, the budget is split by the configured category weights. With the 'proportional'
+    strategy, it is split by the number of points stored in every collection, refreshed every `refresh_interval`
+    seconds, so larger collections contribute more candidates. The budget is distributed with the largest remainder
+    method, so the allocations always sum up to the budget.
+
+    Args:
+        data_category_odms (list[type[EmbeddedChunk]], optional): The collections to search.
+        strategy (str, optional): 'static' or 'proportional'. Defaults to the RETRIEVAL_PLANNER_STRATEGY setting.
+        weights (dict[str, float], optional): The static weight of every data category.
+        refresh_interval (float): The number of seconds the collection sizes are cached for.
+    """
+
+    def __init__(
+        self,
+        data_category_odms: list[type[EmbeddedChunk]] | None = None,
+        strategy: str | None = None,
+        weights: dict[str, float] | None = None,
+        refresh_interval: float = 300.0,
+    ) -> None:
+        self.data_category_odms = data_category_odms or [
+            EmbeddedPostChunk,
+            EmbeddedArticleChunk,
+            EmbeddedRepositoryChunk,
+        ]
+        self.strategy = strategy or settings.RETRIEVAL_PLANNER_STRATEGY
+        self.weights = weights if weights is not None else settings.RETRIEVAL_CATEGORY_WEIGHTS
+        self.refresh_interval = refresh_interval
+
+        if self.strategy not in SUPPORTED_STRATEGIES:
+            raise ImproperlyConfigured(
+                f"Unsupported retrieval planner strategy '{self.strategy}'. Choose one of {SUPPORTED_STRATEGIES}."
+            )
+
+        self._lock = threading.Lock()
+        self._collection_sizes: dict[type[EmbeddedChunk], int] = {}
+        self._collection_sizes_updated_at = float("-inf")
+
+    def plan(self, budget: int) -> dict[type[EmbeddedChunk], int]:
+        """
+        Splits the candidate budget of a single query across the collections.
+
+        Args:
+            budget (int): The total number of candidates to retrieve per query.
+
+        Returns:
+            dict[type[EmbeddedChunk], int]: The search limit of every collection with a non-zero allocation.
+        """
+
+        weights = self._get_weights()
+        total_weight = sum(weights.values())
+        if budget <= 0 or total_weight <= 0:
+            return {}
+
+        quotas = {odm: budget * weight / total_weight for odm, weight in weights.items()}
+        allocation = {odm: int(quota) for odm, quota in quotas.items()}
+
+        remainder = budget - sum(allocation.values())
+        for odm in sorted(quotas, key=lambda odm: quotas[odm] - allocation[odm], reverse=True)[:remainder]:
+            allocation[odm] += 1
+
+        return {odm: limit for odm, limit in allocation.items() if limit > 0}
+
+    def _get_weights(self) -> dict[type[EmbeddedChunk], float]:
+        if self.strategy == "proportional":
+            return {odm: float(size) for odm, size in self._get_collection_sizes().items()}
+
+        return {odm: float(self.weights.get(odm.get_category(), 0.0)) for odm in self.data_category_odms}
+
+    def _get_collection_sizes(self) -> dict[type[EmbeddedChunk], int]:
+        with self._lock:
+            if time.monotonic() - self._collection_sizes_updated_at >= self.refresh_interval:
+                collection_sizes = {}
+                for odm in self.data_category_odms:
+                    try:
+                        collection = connection.get_collection(collection_name=odm.get_collection_name())
+                        collection_sizes[odm] = collection.points_count or 0
+                    except exceptions.UnexpectedResponse:
+                        logger.warning(f"Couldn't get the size of the '{odm.get_collection_name()}' collection.")
+
+                        collection_sizes[odm] = 0
+
+                self._collection_sizes = collection_sizes
+                self._collection_sizes_updated_at = time.monotonic()
+
+            return self._collection_sizes
+
+
+@cache
+def get_retrieval_planner() -> RetrievalPlanner:
+    # Shared by all the retrievers, so the collection sizes are cached across requests.
+    return RetrievalPlanner()
@@ -52,3 +52,27 @@ class SelfQueryTemplate(PromptTemplateFactory):
 
     def create_template(self) -> PromptTemplate:
         return PromptTemplate(template=self.prompt, input_variables=["question"])
+
+
+class SelfQueryExpansionTemplate(PromptTemplateFactory):
+    prompt: str = """You are an AI language model assistant. Your task is to analyze a user question in two ways.
+    First, extract the user name or user id mentioned in the question, if any.
+    Second, generate {expand_to_n} different versions of the given user question to retrieve relevant documents from a
+    vector database. By generating multiple perspectives on the user question, your goal is to help the user overcome
+    some of the limitations of the distance-based similarity search.
+
+    Respond only with a JSON object with the following keys, nothing else:
+    - "author": the extracted user name (e.g., John Doe) or id (e.g. 1345256), or null if there is none.
+    - "queries": a list with the {expand_to_n} alternative questions.
+
+    For example:
+    {{"author": "Paul Iusztin", "queries": ["How do RAG systems retrieve documents?"]}}
+
+    User question: {question}"""
+
+    def create_template(self, expand_to_n: int) -> PromptTemplate:
+        return PromptTemplate(
+            template=self.prompt,
+            input_variables=["question"],
+            partial_variables={"expand_to_n": expand_to_n},
+        )
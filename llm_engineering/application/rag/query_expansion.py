@@ -1,17 +1,24 @@
 import opik
-# from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from loguru import logger
 
 from llm_engineering.domain.queries import Query
 from llm_engineering.settings import settings
+from llm_engineering.infrastructure.llm_clients import allm_call_slot, get_chat_model, llm_call_slot
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
 from llm_engineering.infrastructure.opik_utils import configure_opik
 
-from .base import RAGStep
+from .base import PromptTemplateFactory, RAGStep
+from .expansion_cache import get_query_expansion_cache
 from .prompt_templates import QueryExpansionTemplate
 
 class QueryExpansion(RAGStep):
+    def __init__(self, mock: bool = False) -> None:
+        super().__init__(mock=mock)
+
+        self._cache = get_query_expansion_cache() if not mock else None
+
     @opik.track(name="QueryExpansion.generate")
+    @rag_stage_seconds.time(stage="query_expansion")
     def generate(self, query: Query, expand_to_n: int) -> list[Query]:
         assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
 
@@ -19,19 +26,80 @@ class QueryExpansion(RAGStep):
             return [query for _ in range(expand_to_n)]
 
         query_expansion_template = QueryExpansionTemplate()
+        cache_key = self.get_cache_key(query_expansion_template, query, expand_to_n)
+        if (queries := self.get_cached(query, cache_key)) is not None:
+            return queries
+
+        chain = self._build_chain(query_expansion_template, expand_to_n)
+
+        with llm_call_slot():
+            response = chain.invoke({"question": query})
+
+        queries = self._parse(query, response.content, query_expansion_template.separator)
+        self.set_cached(cache_key, queries)
+
+        return queries
+
+    @opik.track(name="QueryExpansion.agenerate")
+    @rag_stage_seconds.time(stage="query_expansion")
+    async def agenerate(self, query: Query, expand_to_n: int) -> list[Query]:
+        assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
+
+        if self._mock:
+            return [query for _ in range(expand_to_n)]
+
+        query_expansion_template = QueryExpansionTemplate()
+        cache_key = self.get_cache_key(query_expansion_template, query, expand_to_n)
+        if (queries := self.get_cached(query, cache_key)) is not None:
+            return queries
+
+        chain = self._build_chain(query_expansion_template, expand_to_n)
+
+        async with allm_call_slot():
+            response = await chain.ainvoke({"question": query})
+
+        queries = self._parse(query, response.content, query_expansion_template.separator)
+        self.set_cached(cache_key, queries)
+
+        return queries
+
+    def _build_chain(self, query_expansion_template: QueryExpansionTemplate, expand_to_n: int):
         prompt = query_expansion_template.create_template(expand_to_n - 1)
-        model = ChatGoogleGenerativeAI(
-            model=settings.GOOGLE_GEMINI_MODEL,
-            google_api_key=settings.GOOGLE_API_KEY,
-            temperature=0
+        model = get_chat_model(temperature=0)
+
+        return prompt | model
+
+    def get_cache_key(self, prompt_template: PromptTemplateFactory, query: Query, expand_to_n: int) -> str | None:
+        """Returns the expansion cache key of the query for the given prompt, or None if the cache is disabled."""
+
+        if self._cache is None:
+            return None
+
+        return self._cache.make_key(
+            query.content, expand_to_n, model_id=settings.GOOGLE_GEMINI_MODEL, prompt=prompt_template.prompt
         )
 
-        chain = prompt | model
+    def get_cached(self, query: Query, cache_key: str | None) -> list[Query] | None:
+        """Returns the cached expansions of the query, starting with the query itself, or None on a miss."""
+
+        if cache_key is None or (expansions := self._cache.get(cache_key)) is None:
+            return None
+
+        logger.info("Query expansion cache hit.")
+
+        # The original query always comes first, followed by the cached expansions.
+        return [query, *(query.replace_content(content) for content in expansions)]
+
+    def set_cached(self, cache_key: str | None, queries: list[Query]) -> None:
+        """Caches the expanded queries, without the original query that comes first."""
+
+        if cache_key is None:
+            return
 
-        response = chain.invoke({"question": query})
-        result = response.content
+        self._cache.set(cache_key, [query.content for query in queries[1:]])
 
-        queries_content = result.strip().split(query_expansion_template.separator)
+    def _parse(self, query: Query, result: str, separator: str) -> list[Query]:
+        queries_content = result.strip().split(separator)
 
         queries = [query]
         queries += [
@@ -1,25 +1,57 @@
+import hashlib
+import time
+from functools import cache
+
+import numpy as np
 import opik
+from loguru import logger
 
 from llm_engineering.application.networks import CrossEncoderModelSingleton
+from llm_engineering.application.utils import LRUCache
+from llm_engineering.domain.base import VectorBaseDocument
 from llm_engineering.domain.embedded_chunks import EmbeddedChunk
-from llm_engineering.domain.queries import Query
+from llm_engineering.domain.queries import EmbeddedQuery, Query
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
+from llm_engineering.settings import settings
 
 from .base import RAGStep
 
 
+@cache
+def get_score_cache() -> LRUCache[tuple[str, str, str], float]:
+    # Shared by all the Reranker instances, as the API creates a new retriever for every request.
+    return LRUCache(maxsize=settings.RERANKING_CACHE_MAX_SIZE, ttl_seconds=settings.RERANKING_CACHE_TTL_SECONDS)
+
+
 class Reranker(RAGStep):
+    # Exponentially weighted moving average of the cross-encoder cost, shared by all the instances.
+    _seconds_per_pair: float | None = None
+    _seconds_per_pair_smoothing: float = 0.2
+
     def __init__(self, mock: bool = False) -> None:
         super().__init__(mock=mock)
 
         self._model = CrossEncoderModelSingleton()
+        self._score_cache = get_score_cache()
 
     @opik.track(name="Reranker.generate")
-    def generate(self, query: Query, chunks: list[EmbeddedChunk], keep_top_k: int) -> list[EmbeddedChunk]:
+    @rag_stage_seconds.time(stage="rerank")
+    def generate(
+        self,
+        query: Query,
+        chunks: list[EmbeddedChunk],
+        keep_top_k: int,
+        prefilter_top_m: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> list[EmbeddedChunk]:
         if self._mock:
             return chunks
 
-        query_doc_tuples = [(query.content, chunk.content) for chunk in chunks]
-        scores = self._model(query_doc_tuples)
+        top_m = self._get_prefilter_top_m(len(chunks), keep_top_k, prefilter_top_m, latency_budget_ms)
+        if top_m < len(chunks):
+            chunks = self._prefilter(query, chunks, top_m)
+
+        scores = self._score(query, chunks)
 
         scored_query_doc_tuples = list(zip(scores, chunks, strict=False))
         scored_query_doc_tuples.sort(key=lambda x: x[0], reverse=True)
@@ -28,3 +60,68 @@ class Reranker(RAGStep):
         reranked_documents = [doc for _, doc in reranked_documents]
 
         return reranked_documents
+
+    def _get_prefilter_top_m(
+        self, num_chunks: int, keep_top_k: int, prefilter_top_m: int | None, latency_budget_ms: float | None
+    ) -> int:
+        top_m = prefilter_top_m if prefilter_top_m else num_chunks
+        if latency_budget_ms is not None and self._seconds_per_pair:
+            top_m = min(top_m, int(latency_budget_ms / 1000 / self._seconds_per_pair))
+
+        # Never prefilter below the number of chunks the cross-encoder has to return.
+        return max(top_m, keep_top_k)
+
+    def _prefilter(self, query: Query, chunks: list[EmbeddedChunk], top_m: int) -> list[EmbeddedChunk]:
+        """Keeps the top_m chunks by the cosine similarity between their stored embeddings and the query embedding."""
+
+        if not isinstance(query, EmbeddedQuery) or any(chunk.embedding is None for chunk in chunks):
+            logger.warning("Skipping the reranking prefilter, as the query or some chunks aren't embedded.")
+
+            return chunks
+
+        query_embedding = np.asarray(query.embedding, dtype=np.float32)
+
+        similarities = np.empty(len(chunks), dtype=np.float32)
+        positions = {id(chunk): i for i, chunk in enumerate(chunks)}
+        # Every collection may store a different vector size, so the query is projected once per chunk class.
+        for chunk_class, class_chunks in VectorBaseDocument.group_by_class(chunks).items():
+            projected_query = chunk_class.project_vectors(query_embedding)
+            embeddings = np.asarray([chunk.embedding for chunk in class_chunks], dtype=np.float32)
+
+            norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(projected_query)
+            norms[norms == 0] = 1.0
+            class_similarities = (embeddings @ projected_query) / norms
+
+            similarities[[positions[id(chunk)] for chunk in class_chunks]] = class_similarities
+
+        top_m_indices = np.argsort(-similarities)[:top_m]
+
+        return [chunks[i] for i in top_m_indices]
+
+    def _score(self, query: Query, chunks: list[EmbeddedChunk]) -> list[float]:
+        query_hash = hashlib.md5(" ".join(query.content.lower().split()).encode()).hexdigest()
+        keys = [(self._model.model_id, query_hash, str(chunk.id)) for chunk in chunks]
+
+        cached_scores = self._score_cache.get_many(keys)
+        misses = [i for i, key in enumerate(keys) if key not in cached_scores]
+        if misses:
+            # Only the cache misses go through the cross-encoder, all in a single forward pass.
+            query_doc_tuples = [(query.content, chunks[i].content) for i in misses]
+
+            start_time = time.perf_counter()
+            scores = self._model(query_doc_tuples)
+            self._update_seconds_per_pair((time.perf_counter() - start_time) / len(misses))
+
+            new_scores = {keys[i]: float(score) for i, score in zip(misses, scores, strict=False)}
+            self._score_cache.set_many(new_scores)
+            cached_scores = {**cached_scores, **new_scores}
+
+        return [cached_scores[key] for key in keys]
+
+    @classmethod
+    def _update_seconds_per_pair(cls, seconds_per_pair: float) -> None:
+        if cls._seconds_per_pair is None:
+            cls._seconds_per_pair = seconds_per_pair
+        else:
+            alpha = cls._seconds_per_pair_smoothing
+            cls._seconds_per_pair = alpha * seconds_per_pair + (1 - alpha) * cls._seconds_per_pair
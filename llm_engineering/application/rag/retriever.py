@@ -1,4 +1,6 @@
+import asyncio
 import concurrent.futures
+import functools
 
 import opik
 from loguru import logger
@@ -6,66 +8,160 @@ from qdrant_client.models import FieldCondition, Filter, MatchValue
 
 from llm_engineering.application import utils
 from llm_engineering.application.preprocessing.dispatchers import EmbeddingDispatcher
-from llm_engineering.domain.embedded_chunks import (
-    EmbeddedArticleChunk,
-    EmbeddedChunk,
-    EmbeddedPostChunk,
-    EmbeddedRepositoryChunk,
-)
+from llm_engineering.application.preprocessing.operations import bm25_query_vector
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
 from llm_engineering.domain.queries import EmbeddedQuery, Query
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
+from llm_engineering.settings import settings
 
+from .planner import get_retrieval_planner
 from .query_expansion import QueryExpansion
 from .reranking import Reranker
 from .self_query import SelfQuery
+from .self_query_expansion import SelfQueryExpansion
+from .semantic_cache import get_semantic_query_cache
 
 
 class ContextRetriever:
     def __init__(self, mock: bool = False) -> None:
         self._query_expander = QueryExpansion(mock=mock)
         self._metadata_extractor = SelfQuery(mock=mock)
+        self._self_query_expansion = (
+            SelfQueryExpansion(mock=mock, self_query=self._metadata_extractor, query_expansion=self._query_expander)
+            if settings.USE_FUSED_SELF_QUERY_EXPANSION
+            else None
+        )
         self._reranker = Reranker(mock=mock)
+        self._planner = get_retrieval_planner()
+        self._semantic_cache = get_semantic_query_cache() if not mock else None
 
     @opik.track(name="ContextRetriever.search")
+    @rag_stage_seconds.time(stage="retrieval")
     def search(
         self,
         query: str,
         k: int = 3,
         expand_to_n_queries: int = 3,
+        prefilter_top_m: int | None = None,
+        latency_budget_ms: float | None = None,
     ) -> list:
         query_model = Query.from_str(query)
+        with rag_stage_seconds.time(stage="query_embedding"):
+            embedded_query: EmbeddedQuery = EmbeddingDispatcher.dispatch(query_model)
+
+        # Near-identical questions are served from the cache before any LLM call, skipping the self-query, the query
+        # expansion, the searches and the reranker. The author is part of the key, as questions about different
+        # authors embed very close, so it's resolved from the names mentioned verbatim in the query, without the LLM.
+        cache_key = None
+        if self._semantic_cache is not None:
+            cache_key = self._get_cache_key(query_model, k, expand_to_n_queries, prefilter_top_m, latency_budget_ms)
+            cached_documents = self._semantic_cache.get(embedded_query.embedding, key=cache_key)
+            if cached_documents is not None:
+                return cached_documents
+
+        # While the LLM extracts the author and expands the query, the raw query is searched speculatively, without
+        # the author filter that isn't known yet.
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            query_analysis_task = executor.submit(self._analyze_query, query_model, expand_to_n_queries)
+            speculative_search_task = executor.submit(self._search, [embedded_query], k)
+
+            author_query, n_generated_queries = query_analysis_task.result()
+            speculative_documents = speculative_search_task.result()
 
-        query_model = self._metadata_extractor.generate(query_model)
         logger.info(
-            f"Successfully extracted the author_full_name = {query_model.author_full_name} from the query.",
+            f"Successfully extracted the author_full_name = {author_query.author_full_name} from the query.",
         )
-
-        n_generated_queries = self._query_expander.generate(query_model, expand_to_n=expand_to_n_queries)
         logger.info(
             f"Successfully generated {len(n_generated_queries)} search queries.",
         )
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            search_tasks = [executor.submit(self._search, _query_model, k) for _query_model in n_generated_queries]
+        self._attach_author(author_query, [embedded_query, *n_generated_queries])
+
+        # The generated queries are embedded together, in a single forward pass. The first one is the original query,
+        # which is searched again only if too few of the speculative results belong to the extracted author.
+        with rag_stage_seconds.time(stage="expanded_queries_embedding"):
+            embedded_queries: list[EmbeddedQuery] = EmbeddingDispatcher.dispatch(n_generated_queries[1:])
+        speculative_documents = self._filter_speculative_documents(author_query, speculative_documents, k)
+        if speculative_documents is None:
+            speculative_documents = []
+            embedded_queries = [embedded_query, *embedded_queries]
 
-            n_k_documents = [task.result() for task in concurrent.futures.as_completed(search_tasks)]
-            n_k_documents = utils.misc.flatten(n_k_documents)
-            n_k_documents = list(set(n_k_documents))
+        n_k_documents = speculative_documents + self._search(embedded_queries, k)
+        n_k_documents = list(set(n_k_documents))
 
         logger.info(f"{len(n_k_documents)} documents retrieved successfully")
 
         if len(n_k_documents) > 0:
-            k_documents = self.rerank(query, chunks=n_k_documents, keep_top_k=k)
+            k_documents = self.rerank(
+                embedded_query,
+                chunks=n_k_documents,
+                keep_top_k=k,
+                prefilter_top_m=prefilter_top_m,
+                latency_budget_ms=latency_budget_ms,
+            )
         else:
             k_documents = []
 
+        if self._semantic_cache is not None and len(k_documents) > 0:
+            self._semantic_cache.put(embedded_query.embedding, k_documents, key=cache_key)
+
         return k_documents
 
-    def _search(self, query: Query, k: int = 3) -> list[EmbeddedChunk]:
-        assert k >= 3, "k should be >= 3"
+    def _analyze_query(self, query: Query, expand_to_n_queries: int) -> tuple[Query, list[Query]]:
+        """Extracts the author of the query and expands it, with a single LLM call if the fused step is enabled."""
 
+        if self._self_query_expansion is not None:
+            return self._self_query_expansion.generate(query, expand_to_n=expand_to_n_queries)
+
+        # The query expansion doesn't depend on the author, so both LLM calls run concurrently.
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            self_query_task = executor.submit(self._metadata_extractor.generate, query.model_copy())
+            query_expansion_task = executor.submit(
+                self._query_expander.generate, query, expand_to_n=expand_to_n_queries
+            )
+
+            return self_query_task.result(), query_expansion_task.result()
+
+    def _search(self, embedded_queries: list[EmbeddedQuery], k: int = 3) -> list[EmbeddedChunk]:
         def _search_data_category(
-            data_category_odm: type[EmbeddedChunk], embedded_query: EmbeddedQuery
+            data_category_odm: type[EmbeddedChunk], embedded_queries: list[EmbeddedQuery], limit: int
         ) -> list[EmbeddedChunk]:
+            search_kwargs = {
+                "query_vectors": [embedded_query.embedding for embedded_query in embedded_queries],
+                "limit": limit,
+                "query_filters": self._get_query_filters(embedded_queries),
+                # The stored vectors are used by the reranker to prefilter the candidates.
+                "with_vectors": True,
+            }
+
+            # A single batch request answers every query against the collection.
+            with rag_stage_seconds.time(stage="search", collection=data_category_odm.get_collection_name()):
+                if self._use_hybrid_search(data_category_odm):
+                    n_chunks = data_category_odm.hybrid_search_batch(
+                        query_sparse_vectors=self._get_query_sparse_vectors(embedded_queries),
+                        rrf_k=settings.HYBRID_SEARCH_RRF_K,
+                        **search_kwargs,
+                    )
+                else:
+                    n_chunks = data_category_odm.search_batch(**search_kwargs)
+
+            return utils.misc.flatten(n_chunks)
+
+        if len(embedded_queries) == 0:
+            return []
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            search_tasks = [
+                executor.submit(_search_data_category, data_category_odm, embedded_queries, limit)
+                for data_category_odm, limit in self._planner.plan(k).items()
+            ]
+            retrieved_chunks = utils.misc.flatten([task.result() for task in search_tasks])
+
+        return retrieved_chunks
+
+    def _get_query_filters(self, embedded_queries: list[EmbeddedQuery]) -> list[Filter | None]:
+        query_filters = []
+        for embedded_query in embedded_queries:
             if embedded_query.author_id:
                 query_filter = Filter(
                     must=[
@@ -79,29 +175,197 @@ class ContextRetriever:
                 )
             else:
                 query_filter = None
+            query_filters.append(query_filter)
 
-            return data_category_odm.search(
-                query_vector=embedded_query.embedding,
-                limit=k // 3,
-                query_filter=query_filter,
-            )
+        return query_filters
 
-        embedded_query: EmbeddedQuery = EmbeddingDispatcher.dispatch(query)
+    def _use_hybrid_search(self, data_category_odm: type[EmbeddedChunk]) -> bool:
+        return data_category_odm.get_use_sparse_index()
 
-        post_chunks = _search_data_category(EmbeddedPostChunk, embedded_query)
-        articles_chunks = _search_data_category(EmbeddedArticleChunk, embedded_query)
-        # repositories_chunks = _search_data_category(EmbeddedRepositoryChunk, embedded_query)
+    def _get_query_sparse_vectors(self, embedded_queries: list[EmbeddedQuery]) -> list:
+        return [bm25_query_vector(embedded_query.content) for embedded_query in embedded_queries]
 
-        retrieved_chunks = post_chunks + articles_chunks
+    def _attach_author(self, author_query: Query, queries: list[Query]) -> None:
+        for query in queries:
+            query.author_id = author_query.author_id
+            query.author_full_name = author_query.author_full_name
 
-        return retrieved_chunks
+    def _get_cache_key(
+        self,
+        query: Query,
+        k: int,
+        expand_to_n_queries: int,
+        prefilter_top_m: int | None,
+        latency_budget_ms: float | None,
+    ) -> tuple:
+        author_query = self._metadata_extractor.match_author(query.model_copy())
+        author_id = str(author_query.author_id) if author_query is not None else None
+
+        return (author_id, k, expand_to_n_queries, prefilter_top_m, latency_budget_ms)
+
+    def _filter_speculative_documents(
+        self, author_query: Query, speculative_documents: list[EmbeddedChunk], k: int
+    ) -> list[EmbeddedChunk] | None:
+        """Keeps the speculative results of the extracted author, or returns None if too few of them remain."""
+
+        if author_query.author_id is None:
+            return speculative_documents
+
+        speculative_documents = [
+            document for document in speculative_documents if document.author_id == author_query.author_id
+        ]
+        if len(speculative_documents) < k:
+            return None
 
-    def rerank(self, query: str | Query, chunks: list[EmbeddedChunk], keep_top_k: int) -> list[EmbeddedChunk]:
+        return speculative_documents
+
+    def rerank(
+        self,
+        query: str | Query,
+        chunks: list[EmbeddedChunk],
+        keep_top_k: int,
+        prefilter_top_m: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> list[EmbeddedChunk]:
         if isinstance(query, str):
             query = Query.from_str(query)
 
-        reranked_documents = self._reranker.generate(query=query, chunks=chunks, keep_top_k=keep_top_k)
+        prefilter_top_m = prefilter_top_m if prefilter_top_m is not None else settings.RERANKING_PREFILTER_TOP_M
+        latency_budget_ms = latency_budget_ms if latency_budget_ms is not None else settings.RERANKING_LATENCY_BUDGET_MS
+        if (prefilter_top_m or latency_budget_ms is not None) and not isinstance(query, EmbeddedQuery):
+            # The prefilter ranks the chunks by their cosine similarity with the query embedding.
+            query = EmbeddingDispatcher.dispatch(query)
+
+        reranked_documents = self._reranker.generate(
+            query=query,
+            chunks=chunks,
+            keep_top_k=keep_top_k,
+            prefilter_top_m=prefilter_top_m,
+            latency_budget_ms=latency_budget_ms,
+        )
 
         logger.info(f"{len(reranked_documents)} documents reranked successfully.")
 
         return reranked_documents
+
+
+class AsyncContextRetriever(ContextRetriever):
+    """
+    Asyncio variant of the ContextRetriever.
+
+    The LLM calls and the vector searches are awaited on async clients, while the CPU-bound embedding and reranking
+    model calls run in a bounded executor, so a single API worker serves many queries concurrently.
+    """
+
+    @opik.track(name="AsyncContextRetriever.asearch")
+    @rag_stage_seconds.time(stage="retrieval")
+    async def asearch(
+        self,
+        query: str,
+        k: int = 3,
+        expand_to_n_queries: int = 3,
+        prefilter_top_m: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> list:
+        query_model = Query.from_str(query)
+        with rag_stage_seconds.time(stage="query_embedding"):
+            embedded_query: EmbeddedQuery = await utils.run_in_model_executor(EmbeddingDispatcher.dispatch, query_model)
+
+        cache_key = None
+        if self._semantic_cache is not None:
+            # The author directory and the cache invalidation check may block on MongoDB and Qdrant.
+            cache_key = await asyncio.to_thread(
+                self._get_cache_key, query_model, k, expand_to_n_queries, prefilter_top_m, latency_budget_ms
+            )
+            cached_documents = await asyncio.to_thread(
+                self._semantic_cache.get, embedded_query.embedding, key=cache_key
+            )
+            if cached_documents is not None:
+                return cached_documents
+
+        (author_query, n_generated_queries), speculative_documents = await asyncio.gather(
+            self._aanalyze_query(query_model, expand_to_n_queries),
+            self._asearch([embedded_query], k),
+        )
+
+        logger.info(
+            f"Successfully extracted the author_full_name = {author_query.author_full_name} from the query.",
+        )
+        logger.info(
+            f"Successfully generated {len(n_generated_queries)} search queries.",
+        )
+
+        self._attach_author(author_query, [embedded_query, *n_generated_queries])
+
+        with rag_stage_seconds.time(stage="expanded_queries_embedding"):
+            embedded_queries: list[EmbeddedQuery] = await utils.run_in_model_executor(
+                EmbeddingDispatcher.dispatch, n_generated_queries[1:]
+            )
+        speculative_documents = self._filter_speculative_documents(author_query, speculative_documents, k)
+        if speculative_documents is None:
+            speculative_documents = []
+            embedded_queries = [embedded_query, *embedded_queries]
+
+        n_k_documents = speculative_documents + await self._asearch(embedded_queries, k)
+        n_k_documents = list(set(n_k_documents))
+
+        logger.info(f"{len(n_k_documents)} documents retrieved successfully")
+
+        if len(n_k_documents) > 0:
+            k_documents = await utils.run_in_model_executor(
+                self.rerank,
+                embedded_query,
+                chunks=n_k_documents,
+                keep_top_k=k,
+                prefilter_top_m=prefilter_top_m,
+                latency_budget_ms=latency_budget_ms,
+            )
+        else:
+            k_documents = []
+
+        if self._semantic_cache is not None and len(k_documents) > 0:
+            await asyncio.to_thread(self._semantic_cache.put, embedded_query.embedding, k_documents, key=cache_key)
+
+        return k_documents
+
+    async def _aanalyze_query(self, query: Query, expand_to_n_queries: int) -> tuple[Query, list[Query]]:
+        if self._self_query_expansion is not None:
+            return await self._self_query_expansion.agenerate(query, expand_to_n=expand_to_n_queries)
+
+        author_query, n_generated_queries = await asyncio.gather(
+            self._metadata_extractor.agenerate(query.model_copy()),
+            self._query_expander.agenerate(query, expand_to_n=expand_to_n_queries),
+        )
+
+        return author_query, n_generated_queries
+
+    async def _asearch(self, embedded_queries: list[EmbeddedQuery], k: int = 3) -> list[EmbeddedChunk]:
+        if len(embedded_queries) == 0:
+            return []
+
+        query_vectors = [embedded_query.embedding for embedded_query in embedded_queries]
+        query_filters = self._get_query_filters(embedded_queries)
+        # The collection sizes may have to be fetched from Qdrant with the synchronous client.
+        plan = await asyncio.to_thread(self._planner.plan, k)
+
+        search_tasks = []
+        for data_category_odm, limit in plan.items():
+            search_kwargs = {
+                "query_vectors": query_vectors,
+                "limit": limit,
+                "query_filters": query_filters,
+                "with_vectors": True,
+            }
+            if self._use_hybrid_search(data_category_odm):
+                search = functools.partial(
+                    data_category_odm.ahybrid_search_batch,
+                    query_sparse_vectors=self._get_query_sparse_vectors(embedded_queries),
+                    rrf_k=settings.HYBRID_SEARCH_RRF_K,
+                )
+            else:
+                search = data_category_odm.asearch_batch
+            search_timer = rag_stage_seconds.time(stage="search", collection=data_category_odm.get_collection_name())
+            search_tasks.append(search_timer(search)(**search_kwargs))
+        n_chunks_per_category = await asyncio.gather(*search_tasks)
+
+        return utils.misc.flatten([utils.misc.flatten(n_chunks) for n_chunks in n_chunks_per_category])
@@ -1,44 +1,94 @@
+import asyncio
+
 import opik
-# from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from loguru import logger
 
-from llm_engineering.application import utils
 from llm_engineering.domain.documents import UserDocument
 from llm_engineering.domain.queries import Query
-from llm_engineering.settings import settings
+from llm_engineering.infrastructure.llm_clients import allm_call_slot, get_chat_model, llm_call_slot
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
 
+from .author_directory import get_author_directory
 from .base import RAGStep
 from .prompt_templates import SelfQueryTemplate
-from llm_engineering.infrastructure.opik_utils import configure_opik
-
-configure_opik()
 
 
 class SelfQuery(RAGStep):
+    def __init__(self, mock: bool = False) -> None:
+        super().__init__(mock=mock)
+
+        self._author_directory = get_author_directory()
+
     @opik.track(name="SelfQuery.generate")
+    @rag_stage_seconds.time(stage="self_query")
     def generate(self, query: Query) -> Query:
         if self._mock:
             return query
 
-        prompt = SelfQueryTemplate().create_template()
-        model = ChatGoogleGenerativeAI(
-            model=settings.GOOGLE_GEMINI_MODEL,
-            google_api_key=settings.GOOGLE_API_KEY,
-            temperature=0
-        )
+        # Authors mentioned verbatim in the query are resolved without calling the LLM.
+        if (author_query := self.match_author(query)) is not None:
+            return author_query
 
-        chain = prompt | model
+        chain = self._build_chain()
 
-        response = chain.invoke({"question": query})
+        with llm_call_slot():
+            response = chain.invoke({"question": query})
         user_full_name = response.content.strip("\n ")
 
         if user_full_name == "none":
             return query
 
-        first_name, last_name = utils.split_user_full_name(user_full_name)
-        user = UserDocument.get_or_create(first_name=first_name, last_name=last_name)
+        return self.attach_author(query, user_full_name)
+
+    @opik.track(name="SelfQuery.agenerate")
+    @rag_stage_seconds.time(stage="self_query")
+    async def agenerate(self, query: Query) -> Query:
+        if self._mock:
+            return query
+
+        # The author directory may have to reload the users from MongoDB with the synchronous client.
+        if (author_query := await asyncio.to_thread(self.match_author, query)) is not None:
+            return author_query
+
+        chain = self._build_chain()
+
+        async with allm_call_slot():
+            response = await chain.ainvoke({"question": query})
+        user_full_name = response.content.strip("\n ")
+
+        if user_full_name == "none":
+            return query
+
+        return await asyncio.to_thread(self.attach_author, query, user_full_name)
+
+    def _build_chain(self):
+        prompt = SelfQueryTemplate().create_template()
+        model = get_chat_model(temperature=0)
+
+        return prompt | model
+
+    def match_author(self, query: Query) -> Query | None:
+        """Attaches the author mentioned verbatim in the query, or returns None if there isn't exactly one."""
+
+        user = self._author_directory.match_query(query.content)
+        if user is None:
+            return None
+
+        return self._attach_user(query, user)
+
+    def attach_author(self, query: Query, user_full_name: str) -> Query:
+        """Attaches the known user matching the extracted author name, if any."""
+
+        user = self._author_directory.find(user_full_name)
+        if user is None:
+            # Unknown authors aren't created, as they wouldn't match any stored chunk anyway.
+            logger.warning(f"The extracted author '{user_full_name}' doesn't match any known user.")
+
+            return query
+
+        return self._attach_user(query, user)
 
+    def _attach_user(self, query: Query, user: UserDocument) -> Query:
         query.author_id = user.id
         query.author_full_name = user.full_name
 
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import re
+
+import opik
+from loguru import logger
+
+from llm_engineering.domain.queries import Query
+from llm_engineering.infrastructure.llm_clients import allm_call_slot, get_chat_model, llm_call_slot
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
+
+from .base import RAGStep
+from .prompt_templates import SelfQueryExpansionTemplate
+from .query_expansion import QueryExpansion
+from .self_query import SelfQuery
+
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class SelfQueryExpansion(RAGStep):
+    """
+    Extracts the author and expands the query with a single, structured LLM call, instead of one call for each.
+
+    The LLM answers with a JSON object holding both the author and the expanded queries. Whenever the response can't be
+    parsed, it falls back to the separate SelfQuery and QueryExpansion steps. The LLM isn't called at all when the
+    author is mentioned verbatim in the query and the expansion is cached, and only the missing step runs when just
+    one of them is.
+
+    Args:
+        mock (bool): Whether to return the query as is, without calling the LLM.
+        self_query (SelfQuery, optional): The fallback self-query step.
+        query_expansion (QueryExpansion, optional): The fallback query expansion step.
+    """
+
+    def __init__(
+        self, mock: bool = False, self_query: SelfQuery | None = None, query_expansion: QueryExpansion | None = None
+    ) -> None:
+        super().__init__(mock=mock)
+
+        self._self_query = self_query or SelfQuery(mock=mock)
+        self._query_expansion = query_expansion or QueryExpansion(mock=mock)
+
+    @opik.track(name="SelfQueryExpansion.generate")
+    @rag_stage_seconds.time(stage="self_query_expansion")
+    def generate(self, query: Query, expand_to_n: int) -> tuple[Query, list[Query]]:
+        """
+        Extracts the author of the query and expands it into multiple queries.
+
+        Args:
+            query (Query): The query to analyze.
+            expand_to_n (int): The number of queries to return, including the original one.
+
+        Returns:
+            tuple[Query, list[Query]]: A copy of the query with the author attached, and the expanded queries, starting
+                with the original one.
+        """
+
+        assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
+
+        if self._mock:
+            return query.model_copy(), [query for _ in range(expand_to_n)]
+
+        author_query, queries = self._resolve_without_llm(query, expand_to_n)
+        if author_query is not None and queries is not None:
+            return author_query, queries
+        if author_query is not None:
+            return author_query, self._query_expansion.generate(query, expand_to_n=expand_to_n)
+        if queries is not None:
+            return self._self_query.generate(query.model_copy()), queries
+
+        template = SelfQueryExpansionTemplate()
+        chain = template.create_template(expand_to_n - 1) | get_chat_model(temperature=0)
+        with llm_call_slot():
+            response = chain.invoke({"question": query})
+
+        parsed_response = self._parse(response.content)
+        if parsed_response is None:
+            logger.warning("Couldn't parse the fused self-query and expansion response. Running both steps instead.")
+
+            return (
+                self._self_query.generate(query.model_copy()),
+                self._query_expansion.generate(query, expand_to_n=expand_to_n),
+            )
+
+        return self._to_queries(query, expand_to_n, *parsed_response)
+
+    @opik.track(name="SelfQueryExpansion.agenerate")
+    @rag_stage_seconds.time(stage="self_query_expansion")
+    async def agenerate(self, query: Query, expand_to_n: int) -> tuple[Query, list[Query]]:
+        assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
+
+        if self._mock:
+            return query.model_copy(), [query for _ in range(expand_to_n)]
+
+        # The author directory and the expansion cache may block on MongoDB and SQLite.
+        author_query, queries = await asyncio.to_thread(self._resolve_without_llm, query, expand_to_n)
+        if author_query is not None and queries is not None:
+            return author_query, queries
+        if author_query is not None:
+            return author_query, await self._query_expansion.agenerate(query, expand_to_n=expand_to_n)
+        if queries is not None:
+            return await self._self_query.agenerate(query.model_copy()), queries
+
+        template = SelfQueryExpansionTemplate()
+        chain = template.create_template(expand_to_n - 1) | get_chat_model(temperature=0)
+        async with allm_call_slot():
+            response = await chain.ainvoke({"question": query})
+
+        parsed_response = self._parse(response.content)
+        if parsed_response is None:
+            logger.warning("Couldn't parse the fused self-query and expansion response. Running both steps instead.")
+
+            author_query, queries = await asyncio.gather(
+                self._self_query.agenerate(query.model_copy()),
+                self._query_expansion.agenerate(query, expand_to_n=expand_to_n),
+            )
+
+            return author_query, queries
+
+        return await asyncio.to_thread(self._to_queries, query, expand_to_n, *parsed_response)
+
+    def _resolve_without_llm(self, query: Query, expand_to_n: int) -> tuple[Query | None, list[Query] | None]:
+        """Resolves the author from the author directory and the expanded queries from the cache, when possible."""
+
+        author_query = self._self_query.match_author(query.model_copy())
+
+        cache_key = self._query_expansion.get_cache_key(SelfQueryExpansionTemplate(), query, expand_to_n)
+        queries = self._query_expansion.get_cached(query, cache_key)
+
+        return author_query, queries
+
+    def _to_queries(
+        self, query: Query, expand_to_n: int, author: str | None, expanded_contents: list[str]
+    ) -> tuple[Query, list[Query]]:
+        author_query = query.model_copy()
+        if author is not None:
+            author_query = self._self_query.attach_author(author_query, author)
+
+        queries = [query, *(query.replace_content(content) for content in expanded_contents[: expand_to_n - 1])]
+
+        cache_key = self._query_expansion.get_cache_key(SelfQueryExpansionTemplate(), query, expand_to_n)
+        self._query_expansion.set_cached(cache_key, queries)
+
+        return author_query, queries
+
+    @staticmethod
+    def _parse(result: str) -> tuple[str | None, list[str]] | None:
+        """
+        Parses the JSON response of the LLM, tolerating Markdown code fences and text around the JSON object.
+
+        Returns:
+            tuple[str | None, list[str]] | None: The author, if any, and the expanded queries, or None if the response
+                is malformed.
+        """
+
+        match = JSON_OBJECT_PATTERN.search(result)
+        if match is None:
+            return None
+
+        try:
+            response = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+
+        if not isinstance(response, dict) or not isinstance(response.get("queries"), list):
+            return None
+
+        author = response.get("author")
+        if not isinstance(author, str) or author.strip().lower() in ("", "none", "null"):
+            author = None
+        else:
+            author = author.strip()
+
+        expanded_contents = [
+            stripped_content
+            for content in response["queries"]
+            if isinstance(content, str) and (stripped_content := content.strip())
+        ]
+
+        return author, expanded_contents
@@ -0,0 +1,171 @@
+import threading
+import time
+from functools import cache
+from typing import Hashable
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+from qdrant_client.http import exceptions
+
+from llm_engineering.domain.embedded_chunks import (
+    EmbeddedArticleChunk,
+    EmbeddedChunk,
+    EmbeddedPostChunk,
+    EmbeddedRepositoryChunk,
+)
+from llm_engineering.infrastructure.db.generations import get_generations
+from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.settings import settings
+
+
+class SemanticQueryCache:
+    """
+    Caches the final, reranked chunks of ContextRetriever.search by query embedding.
+
+    A lookup hits when a cached query embedding is within `threshold` cosine similarity of the new query and was
+    searched with the same parameters. The cached embeddings are kept as rows of a preallocated, L2-normalized float32
+    matrix, so a lookup is a single matrix-vector product. The least recently used entry is evicted when the cache is
+    full. The whole cache is invalidated when the number of points stored in any of the collections or its generation,
+    bumped after every feature pipeline load, changes, which is checked at most once every
+    `invalidation_check_interval` seconds.
+
+    Args:
+        collections (list[type[EmbeddedChunk]]): The collections the cached results are retrieved from.
+        maxsize (int): The maximum number of cached queries.
+        threshold (float): The minimum cosine similarity between two queries to share their results.
+        invalidation_check_interval (float): The number of seconds between two checks of the collections.
+    """
+
+    def __init__(
+        self,
+        collections: list[type[EmbeddedChunk]],
+        maxsize: int = 1024,
+        threshold: float = 0.97,
+        invalidation_check_interval: float = 30.0,
+    ) -> None:
+        self.collections = collections
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.invalidation_check_interval = invalidation_check_interval
+
+        self._lock = threading.Lock()
+        self._vectors: NDArray[np.float32] | None = None
+        self._keys: list[Hashable | None] = []
+        self._results: list[list[EmbeddedChunk] | None] = []
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._clock = 0
+
+        self._collections_signature: tuple | None = None
+        self._last_invalidation_check = float("-inf")
+
+    def get(
+        self, query_embedding: list[float] | NDArray[np.float32], key: Hashable = None
+    ) -> list[EmbeddedChunk] | None:
+        """
+        Returns the cached results of the most similar query searched with the same key, if any is similar enough.
+
+        Args:
+            query_embedding (list[float] | np.ndarray): The embedding of the new query.
+            key (Hashable, optional): The author and the search parameters, e.g. (author_id, k, expand_to_n_queries).
+
+        Returns:
+            list[EmbeddedChunk] | None: The cached chunks, or None on a cache miss.
+        """
+
+        self._check_invalidation()
+
+        query_vector = self._normalize(query_embedding)
+        with self._lock:
+            if self._vectors is None or len(self._keys) == 0 or self._vectors.shape[1] != len(query_vector):
+                return None
+
+            similarities = self._vectors[: len(self._keys)] @ query_vector
+            same_key = np.fromiter((k == key for k in self._keys), dtype=bool, count=len(self._keys))
+            similarities[~same_key] = -np.inf
+
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+
+            logger.info(f"Semantic cache hit with cosine similarity {similarities[best]:.4f}.")
+
+            return list(self._results[best])
+
+    def put(
+        self, query_embedding: list[float] | NDArray[np.float32], results: list[EmbeddedChunk], key: Hashable = None
+    ) -> None:
+        query_vector = self._normalize(query_embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(query_vector):
+                self._vectors = np.zeros((self.maxsize, len(query_vector)), dtype=np.float32)
+                self._keys, self._results = [], []
+
+            if len(self._keys) < self.maxsize:
+                slot = len(self._keys)
+                self._keys.append(key)
+                self._results.append(results)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._keys[slot] = key
+                self._results[slot] = results
+
+            self._vectors[slot] = query_vector
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._keys, self._results = [], []
+            self._last_used[:] = 0
+
+        logger.info("Semantic cache invalidated.")
+
+    def _check_invalidation(self) -> None:
+        now = time.monotonic()
+        if now - self._last_invalidation_check < self.invalidation_check_interval:
+            return
+        self._last_invalidation_check = now
+
+        signature = self._get_collections_signature()
+        if self._collections_signature is not None and signature != self._collections_signature:
+            self.invalidate()
+        self._collections_signature = signature
+
+    def _get_collections_signature(self) -> tuple:
+        collection_names = [collection.get_collection_name() for collection in self.collections]
+        # A re-ingest may keep the number of points, but always bumps the generation of the collection once loaded.
+        generations = get_generations(collection_names)
+
+        signature = []
+        for collection_name in collection_names:
+            try:
+                points_count = connection.get_collection(collection_name=collection_name).points_count
+            except exceptions.UnexpectedResponse:
+                points_count = None
+            signature.append((points_count, generations[collection_name]))
+
+        return tuple(signature)
+
+    @staticmethod
+    def _normalize(query_embedding: list[float] | NDArray[np.float32]) -> NDArray[np.float32]:
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm > 0 else vector
+
+
+@cache
+def get_semantic_query_cache() -> SemanticQueryCache | None:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    return SemanticQueryCache(
+        collections=[EmbeddedPostChunk, EmbeddedArticleChunk, EmbeddedRepositoryChunk],
+        maxsize=settings.SEMANTIC_CACHE_MAX_SIZE,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        invalidation_check_interval=settings.SEMANTIC_CACHE_INVALIDATION_CHECK_SECONDS,
+    )
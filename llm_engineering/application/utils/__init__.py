@@ -1,4 +1,6 @@
 from . import misc
+from .cache import LRUCache
+from .concurrency import run_in_model_executor
 from .split_user_full_name import split_user_full_name
 
-__all__ = ["misc", "split_user_full_name"]
+__all__ = ["misc", "LRUCache", "run_in_model_executor", "split_user_full_name"]
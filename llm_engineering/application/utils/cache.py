@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe, in-memory LRU cache whose entries optionally expire after a time-to-live.
+
+    Args:
+        maxsize (int): The maximum number of entries. The least recently used ones are evicted first.
+        ttl_seconds (float, optional): The number of seconds an entry stays valid. Entries never expire if None.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            value = self._get(key)
+
+        return default if value is _MISSING else value
+
+    def get_many(self, keys: list[K]) -> dict[K, V]:
+        """Returns the cached value of every key that is present and not expired."""
+
+        hits = {}
+        with self._lock:
+            for key in keys:
+                value = self._get(key)
+                if value is not _MISSING:
+                    hits[key] = value
+
+        return hits
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def set_many(self, items: dict[K, V]) -> None:
+        with self._lock:
+            for key, value in items.items():
+                self._set(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: K):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+
+            return _MISSING
+
+        self._entries.move_to_end(key)
+
+        return value
+
+    def _set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,23 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Callable, TypeVar
+
+from llm_engineering.settings import settings
+
+R = TypeVar("R")
+
+
+@cache
+def get_model_executor() -> ThreadPoolExecutor:
+    # Bounded, so concurrent requests queue up instead of oversubscribing the CPU with model forward passes.
+    return ThreadPoolExecutor(max_workers=settings.RAG_MODEL_EXECUTOR_MAX_WORKERS, thread_name_prefix="rag-model")
+
+
+async def run_in_model_executor(fn: Callable[..., R], *args, **kwargs) -> R:
+    """Runs a CPU-bound model call in the bounded model executor without blocking the event loop."""
+
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(get_model_executor(), functools.partial(fn, *args, **kwargs))
@@ -6,9 +6,10 @@ from pydantic import UUID4, BaseModel, Field
 from pymongo import errors
 from llm_engineering.domain.exceptions import ImproperlyConfigured
 from llm_engineering.infrastructure.db.mongo import connection
+from llm_engineering.infrastructure.lazy import LazyObject
 from llm_engineering.settings import settings
 
-_database = connection.get_database(settings.DATABASE_NAME)
+_database = LazyObject(lambda: connection.get_database(settings.DATABASE_NAME))
 
 T = TypeVar("T", bound="NoSQLBaseDocument")
 
@@ -1,3 +1,5 @@
+import concurrent.futures
+import time
 import uuid
 from abc import ABC
 from typing import Any, Callable, Dict, Generic, Type, TypeVar
@@ -5,18 +7,40 @@ from uuid import UUID
 
 import numpy as np
 from loguru import logger
+from numpy.typing import NDArray
 from pydantic import UUID4, BaseModel, Field
 from qdrant_client.http import exceptions
-from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import CollectionInfo, PointStruct, Record
+from qdrant_client.http.models import (
+    Batch,
+    Datatype,
+    Distance,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
+from qdrant_client.models import (
+    CollectionInfo,
+    Filter,
+    Modifier,
+    PointStruct,
+    QueryRequest,
+    Record,
+    SparseVector,
+    SparseVectorParams,
+)
 
 from llm_engineering.application.networks.embeddings import EmbeddingModelSingleton
 from llm_engineering.domain.exceptions import ImproperlyConfigured
 from llm_engineering.domain.types import DataCategory
-from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.infrastructure.db.local_index import LocalVectorIndex, get_local_vector_index
+from llm_engineering.infrastructure.db.qdrant import async_connection, connection
+from llm_engineering.settings import settings
 
 T = TypeVar("T", bound="VectorBaseDocument")
 
+SPARSE_VECTOR_NAME = "bm25"
+
 
 class VectorBaseDocument(BaseModel, Generic[T], ABC):
     id: UUID4 = Field(default_factory=uuid.uuid4)
@@ -39,8 +63,14 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
             "id": _id,
             **payload,
         }
+        vector = point.vector
+        if isinstance(vector, dict):
+            # Collections with a sparse index store named vectors, where the dense one is unnamed.
+            if cls._has_class_attribute("sparse_embedding"):
+                attributes["sparse_embedding"] = vector.get(SPARSE_VECTOR_NAME)
+            vector = vector.get("")
         if cls._has_class_attribute("embedding"):
-            attributes["embedding"] = point.vector or None
+            attributes["embedding"] = vector or None
 
         return cls(**attributes)
 
@@ -52,9 +82,14 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         _id = str(payload.pop("id"))
         vector = payload.pop("embedding", {})
-        if vector and isinstance(vector, np.ndarray):
+        if isinstance(vector, np.ndarray):
             vector = vector.tolist()
 
+        payload.pop("sparse_embedding", None)
+        sparse_vector = getattr(self, "sparse_embedding", None)
+        if sparse_vector is not None:
+            vector = {"": vector, SPARSE_VECTOR_NAME: sparse_vector}
+
         return PointStruct(id=_id, vector=vector, payload=payload)
 
     def model_dump(self: T, **kwargs) -> dict:
@@ -77,30 +112,149 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
         return item
 
     @classmethod
-    def bulk_insert(cls: Type[T], documents: list["VectorBaseDocument"]) -> bool:
+    def bulk_insert(
+        cls: Type[T],
+        documents: list["VectorBaseDocument"],
+        batch_size: int | None = None,
+        wait: bool | None = None,
+        parallel: int | None = None,
+        max_retries: int | None = None,
+    ) -> bool:
+        """
+        Upserts the documents in batches, keeping up to `parallel` batch requests in flight.
+
+        Args:
+            documents (list[VectorBaseDocument]): The documents to upsert.
+            batch_size (int, optional): The number of points per upsert request.
+            wait (bool, optional): Whether every request waits for its points to be indexed before returning.
+            parallel (int, optional): The maximum number of concurrent upsert requests.
+            max_retries (int, optional): The number of times a failed batch is retried, with exponential backoff.
+
+        Returns:
+            bool: Whether all the documents were upserted.
+        """
+
+        upsert_options = {
+            "batch_size": batch_size or settings.VECTOR_DB_UPSERT_BATCH_SIZE,
+            "wait": wait if wait is not None else settings.VECTOR_DB_UPSERT_WAIT,
+            "parallel": parallel or settings.VECTOR_DB_UPSERT_PARALLEL,
+            "max_retries": max_retries if max_retries is not None else settings.VECTOR_DB_UPSERT_MAX_RETRIES,
+        }
+
         try:
-            cls._bulk_insert(documents)
-        except exceptions.UnexpectedResponse:
+            cls._bulk_insert(documents, **upsert_options)
+        except exceptions.UnexpectedResponse as e:
+            if e.status_code != 404:
+                logger.exception(f"Failed to insert documents in '{cls.get_collection_name()}'.")
+
+                return False
+
             logger.info(
                 f"Collection '{cls.get_collection_name()}' does not exist. Trying to create the collection and reinsert the documents."
             )
 
-            cls.create_collection()
-
             try:
-                cls._bulk_insert(documents)
-            except exceptions.UnexpectedResponse:
-                logger.error(f"Failed to insert documents in '{cls.get_collection_name()}'.")
+                cls.create_collection()
+                cls._bulk_insert(documents, **upsert_options)
+            except Exception:
+                logger.exception(f"Failed to insert documents in '{cls.get_collection_name()}'.")
 
                 return False
+        except Exception:
+            logger.exception(f"Failed to insert documents in '{cls.get_collection_name()}'.")
+
+            return False
 
         return True
 
     @classmethod
-    def _bulk_insert(cls: Type[T], documents: list["VectorBaseDocument"]) -> None:
-        points = [doc.to_point() for doc in documents]
+    def _bulk_insert(
+        cls: Type[T],
+        documents: list["VectorBaseDocument"],
+        batch_size: int = 256,
+        wait: bool = False,
+        parallel: int = 4,
+        max_retries: int = 3,
+    ) -> None:
+        collection_name = cls.get_collection_name()
+
+        if not cls._has_class_attribute("embedding") or any(doc.embedding is None for doc in documents):
+            points = [doc.to_point() for doc in documents]
 
-        connection.upsert(collection_name=cls.get_collection_name(), points=points)
+            def get_batch(start: int, end: int) -> list[PointStruct]:
+                return points[start:end]
+
+        else:
+            # Stream the vectors from a single float32 matrix, materializing Python lists for one batch at a time.
+            # Documents read back from a ZenML artifact hold lists, which are stacked once here.
+            ids, vectors, payloads = cls._to_columns(documents)
+            sparse_vectors = [getattr(doc, "sparse_embedding", None) for doc in documents]
+            has_sparse_vectors = all(sparse_vector is not None for sparse_vector in sparse_vectors)
+
+            def get_batch(start: int, end: int) -> Batch:
+                batch_vectors = vectors[start:end].tolist()
+                if has_sparse_vectors:
+                    batch_vectors = {"": batch_vectors, SPARSE_VECTOR_NAME: sparse_vectors[start:end]}
+
+                return Batch(ids=ids[start:end], vectors=batch_vectors, payloads=payloads[start:end])
+
+        def upsert_batch(start: int) -> None:
+            for attempt in range(max_retries + 1):
+                try:
+                    connection.upsert(
+                        collection_name=collection_name, points=get_batch(start, start + batch_size), wait=wait
+                    )
+
+                    return
+                except Exception as e:
+                    if attempt == max_retries or not cls._is_retryable(e):
+                        raise
+
+                    delay = 0.5 * 2**attempt
+                    logger.warning(
+                        f"Upserting the batch at offset {start} into '{collection_name}' failed: {e}. "
+                        f"Retrying in {delay:.1f} seconds."
+                    )
+                    time.sleep(delay)
+
+        starts = range(0, len(documents), batch_size)
+        if parallel <= 1 or len(starts) <= 1:
+            for start in starts:
+                upsert_batch(start)
+
+            return
+
+        # The batches are built lazily by the workers, so at most `parallel` of them are materialized at once.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+            upsert_tasks = [executor.submit(upsert_batch, start) for start in starts]
+            for upsert_task in concurrent.futures.as_completed(upsert_tasks):
+                if (exception := upsert_task.exception()) is not None:
+                    for pending_task in upsert_tasks:
+                        pending_task.cancel()
+
+                    raise exception
+
+    @staticmethod
+    def _is_retryable(exception: Exception) -> bool:
+        # Client errors, like a missing collection, fail the same way on every attempt. Rate limits don't.
+        if isinstance(exception, exceptions.UnexpectedResponse):
+            return exception.status_code == 429 or exception.status_code >= 500
+
+        return True
+
+    @classmethod
+    def _to_columns(
+        cls: Type[T], documents: list["VectorBaseDocument"]
+    ) -> tuple[list[str], NDArray[np.float32], list[dict]]:
+        ids, payloads = [], []
+        for doc in documents:
+            payload = doc.model_dump(by_alias=True, exclude={"embedding", "sparse_embedding"})
+            ids.append(str(payload.pop("id")))
+            payloads.append(payload)
+
+        vectors = np.stack([np.asarray(doc.embedding, dtype=np.float32) for doc in documents])
+
+        return ids, vectors, payloads
 
     @classmethod
     def bulk_find(cls: Type[T], limit: int = 10, **kwargs) -> tuple[list[T], UUID | None]:
@@ -148,6 +302,15 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
     @classmethod
     def _search(cls: Type[T], query_vector: list, limit: int = 10, **kwargs) -> list[T]:
         collection_name = cls.get_collection_name()
+        if cls.get_vector_size() is not None:
+            query_vector = cls.project_vectors(np.asarray(query_vector, dtype=np.float32)).tolist()
+
+        local_documents = cls._local_search_batch(
+            [query_vector], limit=limit, query_filters=[kwargs.get("query_filter")], **kwargs
+        )
+        if local_documents is not None:
+            return local_documents[0]
+
         records = connection.search(
             collection_name=collection_name,
             query_vector=query_vector,
@@ -160,6 +323,221 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         return documents
 
+    @classmethod
+    def search_batch(
+        cls: Type[T], query_vectors: list[list], limit: int = 10, query_filters: list[Filter | None] | None = None, **kwargs
+    ) -> list[list[T]]:
+        try:
+            documents = cls._search_batch(query_vectors=query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        except exceptions.UnexpectedResponse:
+            logger.error(f"Failed to batch search documents in '{cls.get_collection_name()}'.")
+
+            documents = [[] for _ in query_vectors]
+
+        return documents
+
+    @classmethod
+    def _search_batch(
+        cls: Type[T], query_vectors: list[list], limit: int = 10, query_filters: list[Filter | None] | None = None, **kwargs
+    ) -> list[list[T]]:
+        if len(query_vectors) == 0:
+            return []
+
+        local_documents = cls._local_search_batch(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        if local_documents is not None:
+            return local_documents
+
+        collection_name = cls.get_collection_name()
+        requests = cls._to_query_requests(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        # All the queries are answered by a single round trip to the collection.
+        responses = connection.query_batch_points(collection_name=collection_name, requests=requests)
+        documents = [[cls.from_record(point) for point in response.points] for response in responses]
+
+        return documents
+
+    @classmethod
+    async def asearch_batch(
+        cls: Type[T], query_vectors: list[list], limit: int = 10, query_filters: list[Filter | None] | None = None, **kwargs
+    ) -> list[list[T]]:
+        try:
+            documents = await cls._asearch_batch(
+                query_vectors=query_vectors, limit=limit, query_filters=query_filters, **kwargs
+            )
+        except exceptions.UnexpectedResponse:
+            logger.error(f"Failed to batch search documents in '{cls.get_collection_name()}'.")
+
+            documents = [[] for _ in query_vectors]
+
+        return documents
+
+    @classmethod
+    async def _asearch_batch(
+        cls: Type[T], query_vectors: list[list], limit: int = 10, query_filters: list[Filter | None] | None = None, **kwargs
+    ) -> list[list[T]]:
+        if len(query_vectors) == 0:
+            return []
+
+        # The in-process index answers in well under a millisecond, so it doesn't need to leave the event loop.
+        local_documents = cls._local_search_batch(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        if local_documents is not None:
+            return local_documents
+
+        collection_name = cls.get_collection_name()
+        requests = cls._to_query_requests(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        responses = await async_connection.query_batch_points(collection_name=collection_name, requests=requests)
+        documents = [[cls.from_record(point) for point in response.points] for response in responses]
+
+        return documents
+
+    @classmethod
+    def _local_search_batch(
+        cls: Type[T], query_vectors: list[list], limit: int = 10, query_filters: list[Filter | None] | None = None, **kwargs
+    ) -> list[list[T]] | None:
+        """Searches the in-process mirror of the collection, or returns None if it's disabled or can't answer."""
+
+        local_index = get_local_vector_index(cls.get_collection_name())
+        query_filters = query_filters or [None] * len(query_vectors)
+        if local_index is None or not all(LocalVectorIndex.supports_filter(f) for f in query_filters):
+            return None
+
+        if cls.get_vector_size() is not None:
+            query_vectors = cls.project_vectors(np.asarray(query_vectors, dtype=np.float32))
+
+        n_points = local_index.search_batch(
+            query_vectors,
+            limit=limit,
+            query_filters=query_filters,
+            with_payload=kwargs.get("with_payload", True),
+            with_vectors=kwargs.get("with_vectors", False),
+        )
+
+        return [[cls.from_record(point) for point in points] for points in n_points]
+
+    @classmethod
+    def hybrid_search_batch(
+        cls: Type[T],
+        query_vectors: list[list],
+        query_sparse_vectors: list[SparseVector],
+        limit: int = 10,
+        query_filters: list[Filter | None] | None = None,
+        rrf_k: int = 60,
+        **kwargs,
+    ) -> list[list[T]]:
+        try:
+            documents = cls._hybrid_search_batch(
+                query_vectors=query_vectors,
+                query_sparse_vectors=query_sparse_vectors,
+                limit=limit,
+                query_filters=query_filters,
+                rrf_k=rrf_k,
+                **kwargs,
+            )
+        except exceptions.UnexpectedResponse:
+            logger.error(f"Failed to hybrid search documents in '{cls.get_collection_name()}'.")
+
+            documents = [[] for _ in query_vectors]
+
+        return documents
+
+    @classmethod
+    def _hybrid_search_batch(
+        cls: Type[T],
+        query_vectors: list[list],
+        query_sparse_vectors: list[SparseVector],
+        limit: int = 10,
+        query_filters: list[Filter | None] | None = None,
+        rrf_k: int = 60,
+        **kwargs,
+    ) -> list[list[T]]:
+        if len(query_vectors) == 0:
+            return []
+
+        collection_name = cls.get_collection_name()
+        # The dense and the sparse queries share a single round trip and are fused on the client.
+        requests = cls._to_query_requests(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+        requests += cls._to_query_requests(
+            query_sparse_vectors, limit=limit, query_filters=query_filters, using=SPARSE_VECTOR_NAME, **kwargs
+        )
+        responses = connection.query_batch_points(collection_name=collection_name, requests=requests)
+
+        return cls._fuse_responses(responses, num_queries=len(query_vectors), limit=limit, rrf_k=rrf_k)
+
+    @classmethod
+    async def ahybrid_search_batch(
+        cls: Type[T],
+        query_vectors: list[list],
+        query_sparse_vectors: list[SparseVector],
+        limit: int = 10,
+        query_filters: list[Filter | None] | None = None,
+        rrf_k: int = 60,
+        **kwargs,
+    ) -> list[list[T]]:
+        try:
+            if len(query_vectors) == 0:
+                return []
+
+            collection_name = cls.get_collection_name()
+            requests = cls._to_query_requests(query_vectors, limit=limit, query_filters=query_filters, **kwargs)
+            requests += cls._to_query_requests(
+                query_sparse_vectors, limit=limit, query_filters=query_filters, using=SPARSE_VECTOR_NAME, **kwargs
+            )
+            responses = await async_connection.query_batch_points(collection_name=collection_name, requests=requests)
+            documents = cls._fuse_responses(responses, num_queries=len(query_vectors), limit=limit, rrf_k=rrf_k)
+        except exceptions.UnexpectedResponse:
+            logger.error(f"Failed to hybrid search documents in '{cls.get_collection_name()}'.")
+
+            documents = [[] for _ in query_vectors]
+
+        return documents
+
+    @classmethod
+    def _fuse_responses(cls: Type[T], responses: list, num_queries: int, limit: int, rrf_k: int) -> list[list[T]]:
+        """Fuses the dense (first half) and sparse (second half) responses of every query with reciprocal rank fusion."""
+
+        documents = []
+        for dense_response, sparse_response in zip(responses[:num_queries], responses[num_queries:], strict=True):
+            scores, points = {}, {}
+            for ranking in (dense_response.points, sparse_response.points):
+                for rank, point in enumerate(ranking):
+                    scores[point.id] = scores.get(point.id, 0.0) + 1.0 / (rrf_k + rank + 1)
+                    points.setdefault(point.id, point)
+
+            fused_ids = sorted(scores, key=scores.get, reverse=True)[:limit]
+            documents.append([cls.from_record(points[point_id]) for point_id in fused_ids])
+
+        return documents
+
+    @classmethod
+    def _to_query_requests(
+        cls: Type[T],
+        query_vectors: list,
+        limit: int = 10,
+        query_filters: list[Filter | None] | None = None,
+        using: str | None = None,
+        **kwargs,
+    ) -> list[QueryRequest]:
+        query_filters = query_filters or [None] * len(query_vectors)
+        assert len(query_filters) == len(query_vectors), "Expected one query filter per query vector."
+
+        if using is None and cls.get_vector_size() is not None:
+            query_vectors = cls.project_vectors(np.asarray(query_vectors, dtype=np.float32)).tolist()
+
+        with_payload = kwargs.pop("with_payload", True)
+        with_vectors = kwargs.pop("with_vectors", False)
+
+        return [
+            QueryRequest(
+                query=query_vector,
+                using=using,
+                filter=query_filter,
+                limit=limit,
+                with_payload=with_payload,
+                with_vector=with_vectors,
+                **kwargs,
+            )
+            for query_vector, query_filter in zip(query_vectors, query_filters, strict=True)
+        ]
+
     @classmethod
     def get_or_create_collection(cls: Type[T]) -> CollectionInfo:
         collection_name = cls.get_collection_name()
@@ -186,12 +564,68 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def _create_collection(cls, collection_name: str, use_vector_index: bool = True) -> bool:
+        quantization_config = None
         if use_vector_index is True:
-            vectors_config = VectorParams(size=EmbeddingModelSingleton().embedding_size, distance=Distance.COSINE)
+            vector_quantization = cls.get_vector_quantization()
+            if vector_quantization == "int8":
+                # Keep only the int8 vectors in RAM. The originals live on disk and are used to rescore the results.
+                quantization_config = ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+                )
+            elif vector_quantization is not None:
+                raise ImproperlyConfigured(f"Unsupported vector quantization '{vector_quantization}'. Use 'int8'.")
+
+            vectors_config = VectorParams(
+                size=cls.get_vector_size() or EmbeddingModelSingleton().embedding_size,
+                distance=Distance.COSINE,
+                datatype=Datatype(cls.get_vector_datatype()),
+                on_disk=quantization_config is not None,
+            )
         else:
             vectors_config = {}
 
-        return connection.create_collection(collection_name=collection_name, vectors_config=vectors_config)
+        sparse_vectors_config = None
+        if use_vector_index is True and cls.get_use_sparse_index():
+            # Qdrant weights the stored BM25 term frequencies by the IDF of the collection at search time.
+            sparse_vectors_config = {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+
+        return connection.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config,
+            sparse_vectors_config=sparse_vectors_config,
+            quantization_config=quantization_config,
+        )
+
+    @classmethod
+    def project_vectors(cls: Type[T], vectors: NDArray[np.float32]) -> NDArray[np.float32]:
+        """
+        Projects full-size embeddings into the vector space stored by the collection.
+
+        The same projection is applied to the indexed documents and to the queries, so they stay comparable.
+        Truncated (Matryoshka-style) embeddings are re-normalized to unit length.
+
+        Args:
+            vectors (np.ndarray): A single embedding or a matrix with one embedding per row.
+
+        Returns:
+            np.ndarray: The projected embeddings, with the same number of dimensions as the input.
+        """
+
+        vector_size = cls.get_vector_size()
+        if vector_size is None or vectors.shape[-1] == vector_size:
+            return vectors
+
+        if vectors.shape[-1] < vector_size:
+            raise ImproperlyConfigured(
+                f"Can't project {vectors.shape[-1]}-dimensional embeddings to {vector_size} dimensions "
+                f"for '{cls.get_collection_name()}'."
+            )
+
+        truncated = vectors[..., :vector_size]
+        norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        return (truncated / norms).astype(np.float32)
 
     @classmethod
     def get_category(cls: Type[T]) -> DataCategory:
@@ -219,6 +653,52 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         return cls.Config.use_vector_index
 
+    @classmethod
+    def get_use_sparse_index(cls: Type[T]) -> bool:
+        """Whether the collection also stores BM25 sparse vectors for hybrid search, which is opt-in."""
+
+        if not settings.USE_HYBRID_SEARCH:
+            # Collections created without a sparse index reject the points with named vectors.
+            return False
+
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "use_sparse_index"):
+            return False
+
+        return cls.Config.use_sparse_index
+
+    @classmethod
+    def get_vector_size(cls: Type[T]) -> int | None:
+        """The number of embedding dimensions to store, or None to store the full embeddings."""
+
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "vector_size"):
+            return None
+
+        return cls.Config.vector_size
+
+    @classmethod
+    def get_vector_datatype(cls: Type[T]) -> str:
+        """The datatype of the stored vectors: 'float32' or 'float16'."""
+
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "vector_datatype"):
+            return Datatype.FLOAT32.value
+
+        if cls.Config.vector_datatype not in (Datatype.FLOAT32, Datatype.FLOAT16):
+            raise ImproperlyConfigured(
+                f"Unsupported vector datatype '{cls.Config.vector_datatype}'. Use 'float32' or 'float16', "
+                "or set vector_quantization = 'int8' for 8-bit vectors."
+            )
+
+        return cls.Config.vector_datatype
+
+    @classmethod
+    def get_vector_quantization(cls: Type[T]) -> str | None:
+        """The quantization of the in-memory vectors: 'int8' or None."""
+
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "vector_quantization"):
+            return None
+
+        return cls.Config.vector_quantization
+
     @classmethod
     def group_by_class(
         cls: Type["VectorBaseDocument"], documents: list["VectorBaseDocument"]
@@ -1,6 +1,8 @@
 from abc import ABC
 
-from pydantic import UUID4, Field
+import numpy as np
+from pydantic import UUID4, ConfigDict, Field, field_serializer
+from qdrant_client.models import SparseVector
 
 from llm_engineering.domain.types import DataCategory
 
@@ -8,14 +10,28 @@ from .base import VectorBaseDocument
 
 
 class EmbeddedChunk(VectorBaseDocument, ABC):
+    # Embeddings are kept as float32 rows of the batch matrix they were computed in, to avoid a Python float per
+    # dimension. They are converted to lists when serialized to JSON, which includes the ZenML artifacts between the
+    # embedding and loading steps, so the saving only holds within a process (e.g. the embed step or the API).
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     content: str
-    embedding: list[float] | None
+    embedding: list[float] | np.ndarray | None
+    # BM25 term weights used by the hybrid (dense + sparse) search.
+    sparse_embedding: SparseVector | None = None
     platform: str
     document_id: UUID4
     author_id: UUID4
     author_full_name: str
     metadata: dict = Field(default_factory=dict)
 
+    @field_serializer("embedding", when_used="json")
+    def serialize_embedding(self, embedding: list[float] | np.ndarray | None) -> list[float] | None:
+        if isinstance(embedding, np.ndarray):
+            return embedding.tolist()
+
+        return embedding
+
     @classmethod
     def to_context(cls, chunks: list["EmbeddedChunk"]) -> str:
         context = ""
@@ -36,6 +52,7 @@ class EmbeddedPostChunk(EmbeddedChunk):
         name = "embedded_posts"
         category = DataCategory.POSTS
         use_vector_index = True
+        use_sparse_index = True
 
 
 class EmbeddedArticleChunk(EmbeddedChunk):
@@ -45,6 +62,7 @@ class EmbeddedArticleChunk(EmbeddedChunk):
         name = "embedded_articles"
         category = DataCategory.ARTICLES
         use_vector_index = True
+        use_sparse_index = True
 
 
 class EmbeddedRepositoryChunk(EmbeddedChunk):
@@ -55,3 +73,4 @@ class EmbeddedRepositoryChunk(EmbeddedChunk):
         name = "embedded_repositories"
         category = DataCategory.REPOSITORIES
         use_vector_index = True
+        use_sparse_index = True
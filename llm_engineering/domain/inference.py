@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 
@@ -20,3 +21,8 @@ class Inference(ABC):
     @abstractmethod
     def inference(self):
         pass
+
+    async def ainference(self):
+        """Performs the inference asynchronously. Defaults to running the blocking inference in a worker thread."""
+
+        return await asyncio.to_thread(self.inference)
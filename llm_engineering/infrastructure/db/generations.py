@@ -0,0 +1,30 @@
+from loguru import logger
+from pymongo import errors
+
+from llm_engineering.infrastructure.db.mongo import connection
+from llm_engineering.infrastructure.lazy import LazyObject
+from llm_engineering.settings import settings
+
+# The feature pipeline bumps the generation of a vector collection after every successful load. It's stored in MongoDB
+# so it's shared by the feature pipelines and the API workers. Caches built from a collection compare generations to
+# detect re-ingests that keep the number of points unchanged.
+_generations = LazyObject(lambda: connection.get_database(settings.DATABASE_NAME)["vector_collection_generations"])
+
+
+def bump_generation(collection_name: str) -> None:
+    try:
+        _generations.update_one({"_id": collection_name}, {"$inc": {"generation": 1}}, upsert=True)
+    except errors.PyMongoError:
+        logger.warning(f"Couldn't bump the generation of the '{collection_name}' collection.")
+
+
+def get_generations(collection_names: list[str]) -> dict[str, int | None]:
+    try:
+        documents = _generations.find({"_id": {"$in": collection_names}})
+        generations = {document["_id"]: document["generation"] for document in documents}
+    except errors.PyMongoError:
+        logger.warning("Couldn't get the generations of the vector collections.")
+
+        return {collection_name: None for collection_name in collection_names}
+
+    return {collection_name: generations.get(collection_name, 0) for collection_name in collection_names}
@@ -0,0 +1,316 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+from qdrant_client.models import FieldCondition, Filter, MatchValue, ScoredPoint
+
+from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.settings import settings
+
+try:
+    import hnswlib
+except ModuleNotFoundError:
+    hnswlib = None
+
+
+class LocalVectorIndex:
+    """
+    An in-process, read-only mirror of a Qdrant collection.
+
+    The L2-normalized vectors are stored as a float32 matrix on disk and read back through a memory map, next to the
+    point ids and payloads. Searches are exact (brute-force cosine) unless an HNSW graph was built with hnswlib.
+    Only filters made of `must` conditions matching a payload value (e.g. the author_id filter) are supported.
+
+    Every build is written to a new version directory, and the manifest of the collection is then atomically switched
+    to it, so a rebuild never modifies the files of an index that is being searched.
+    """
+
+    def __init__(self, collection_name: str, index_dir: str | Path | None = None, version: str | None = None) -> None:
+        self.collection_name = collection_name
+        self._collection_dir = self.get_collection_dir(collection_name, index_dir=index_dir)
+        self.version = version or self._read_version()
+
+        self._root_dir = self._collection_dir / (self.version or "")
+        self._vectors_path = self._root_dir / "vectors.f32"
+        self._points_path = self._root_dir / "points.json"
+        self._meta_path = self._root_dir / "meta.json"
+        self._hnsw_path = self._root_dir / "hnsw.bin"
+
+        self._lock = Lock()
+        self._loaded = False
+        self._ids: list[str] = []
+        self._payloads: list[dict] = []
+        self._vectors: np.memmap | None = None
+        self._hnsw_index = None
+        self._columns: dict[str, NDArray] = {}
+
+    @staticmethod
+    def get_collection_dir(collection_name: str, index_dir: str | Path | None = None) -> Path:
+        return Path(index_dir or settings.LOCAL_VECTOR_INDEX_DIR) / collection_name
+
+    @classmethod
+    def get_manifest_path(cls, collection_name: str, index_dir: str | Path | None = None) -> Path:
+        return cls.get_collection_dir(collection_name, index_dir=index_dir) / "manifest.json"
+
+    def exists(self) -> bool:
+        return self.version is not None and self._meta_path.exists()
+
+    def __len__(self) -> int:
+        self._load()
+
+        return len(self._ids)
+
+    @classmethod
+    def build(
+        cls, collection_name: str, index_dir: str | Path | None = None, use_hnsw: bool | None = None, batch_size: int = 256
+    ) -> "LocalVectorIndex":
+        """
+        Builds the local index from a scroll snapshot of a Qdrant collection.
+
+        Args:
+            collection_name (str): The name of the collection to mirror.
+            index_dir (str | Path, optional): The root directory of the local indexes.
+            use_hnsw (bool, optional): Whether to also build an HNSW graph. Requires hnswlib.
+            batch_size (int): The number of points fetched per scroll request.
+
+        Returns:
+            LocalVectorIndex: The built index.
+        """
+
+        previous_version = cls(collection_name, index_dir=index_dir).version
+        index = cls(collection_name, index_dir=index_dir, version=str(time.time_ns()))
+        use_hnsw = use_hnsw if use_hnsw is not None else settings.LOCAL_VECTOR_INDEX_USE_HNSW
+
+        ids, payloads, vectors = [], [], []
+        offset = None
+        while True:
+            records, offset = connection.scroll(
+                collection_name=collection_name, limit=batch_size, with_payload=True, with_vectors=True, offset=offset
+            )
+            for record in records:
+                vector = record.vector
+                if isinstance(vector, dict):
+                    # Collections with a sparse index store named vectors, where the dense one is unnamed.
+                    vector = vector.get("")
+                ids.append(str(record.id))
+                payloads.append(record.payload or {})
+                vectors.append(np.asarray(vector, dtype=np.float32))
+
+            if offset is None:
+                break
+
+        index._root_dir.mkdir(parents=True)
+
+        matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        matrix.tofile(index._vectors_path)
+        index._points_path.write_text(json.dumps({"ids": ids, "payloads": payloads}))
+
+        if use_hnsw and len(ids) > 0:
+            if hnswlib is None:
+                logger.warning("hnswlib is not installed. The local vector index will use brute-force search.")
+            else:
+                hnsw_index = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+                hnsw_index.init_index(max_elements=len(ids), ef_construction=200, M=16)
+                hnsw_index.add_items(matrix, np.arange(len(ids)))
+                hnsw_index.save_index(str(index._hnsw_path))
+
+        index._meta_path.write_text(json.dumps({"num_points": len(ids), "dim": int(matrix.shape[1])}))
+        index._write_manifest()
+
+        # The previous version is kept, as the API workers may still be searching it until they reload the index.
+        for path in index._collection_dir.iterdir():
+            if path.is_dir() and path.name not in (index.version, previous_version):
+                shutil.rmtree(path, ignore_errors=True)
+
+        logger.info(f"Built the local vector index of '{collection_name}' with {len(ids)} points.")
+
+        return index
+
+    @staticmethod
+    def supports_filter(query_filter: Filter | None) -> bool:
+        if query_filter is None:
+            return True
+
+        if query_filter.should or query_filter.must_not or query_filter.min_should:
+            return False
+
+        must = query_filter.must if isinstance(query_filter.must, list) else [query_filter.must]
+
+        return all(
+            isinstance(condition, FieldCondition) and isinstance(condition.match, MatchValue) for condition in must
+        )
+
+    def search_batch(
+        self,
+        query_vectors: list[list[float]] | NDArray[np.float32],
+        limit: int = 10,
+        query_filters: list[Filter | None] | None = None,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+    ) -> list[list[ScoredPoint]]:
+        self._load()
+
+        query_filters = query_filters or [None] * len(query_vectors)
+        query_matrix = np.asarray(query_vectors, dtype=np.float32)
+        if len(self._ids) == 0 or len(query_matrix) == 0:
+            return [[] for _ in query_filters]
+
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        query_matrix = query_matrix / norms
+
+        results = []
+        for query_vector, query_filter in zip(query_matrix, query_filters, strict=True):
+            mask = self._get_mask(query_filter)
+            if self._hnsw_index is not None:
+                rows, scores = self._hnsw_search(query_vector, limit, mask)
+            else:
+                rows, scores = self._brute_force_search(query_vector, limit, mask)
+
+            results.append(
+                [
+                    ScoredPoint(
+                        id=self._ids[row],
+                        version=0,
+                        score=float(score),
+                        payload=self._payloads[row] if with_payload else None,
+                        vector=self._vectors[row].tolist() if with_vectors else None,
+                    )
+                    for row, score in zip(rows, scores, strict=True)
+                ]
+            )
+
+        return results
+
+    def _brute_force_search(
+        self, query_vector: NDArray[np.float32], limit: int, mask: NDArray[np.bool_] | None
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        scores = self._vectors @ query_vector
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            limit = min(limit, int(mask.sum()))
+
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.argpartition(-scores, limit - 1)[:limit]
+        rows = rows[np.argsort(-scores[rows])]
+
+        return rows, scores[rows]
+
+    def _hnsw_search(
+        self, query_vector: NDArray[np.float32], limit: int, mask: NDArray[np.bool_] | None
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        num_candidates = int(mask.sum()) if mask is not None else len(self._ids)
+        limit = min(limit, num_candidates)
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        self._hnsw_index.set_ef(max(limit * 2, 50))
+        try:
+            labels, distances = self._hnsw_index.knn_query(
+                query_vector, k=limit, filter=(lambda label: bool(mask[label])) if mask is not None else None
+            )
+        except RuntimeError:
+            # The graph search may reach fewer than `limit` points passing the filter, in which case hnswlib raises.
+            logger.debug(f"The HNSW search of '{self.collection_name}' found too few points. Searching exhaustively.")
+
+            return self._brute_force_search(query_vector, limit, mask)
+
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def _get_mask(self, query_filter: Filter | None) -> NDArray[np.bool_] | None:
+        if query_filter is None:
+            return None
+
+        if not self.supports_filter(query_filter):
+            raise ValueError(f"Unsupported filter for the local vector index: {query_filter}")
+
+        must = query_filter.must if isinstance(query_filter.must, list) else [query_filter.must]
+        mask = np.ones(len(self._ids), dtype=bool)
+        for condition in must:
+            mask &= self._get_column(condition.key) == condition.match.value
+
+        return mask
+
+    def _get_column(self, key: str) -> NDArray:
+        if key not in self._columns:
+            self._columns[key] = np.array([payload.get(key) for payload in self._payloads], dtype=object)
+
+        return self._columns[key]
+
+    def _read_version(self) -> str | None:
+        manifest_path = self._collection_dir / "manifest.json"
+        if not manifest_path.exists():
+            return None
+
+        return json.loads(manifest_path.read_text())["version"]
+
+    def _write_manifest(self) -> None:
+        manifest_path = self._collection_dir / "manifest.json"
+        tmp_manifest_path = manifest_path.with_suffix(".json.tmp")
+        tmp_manifest_path.write_text(json.dumps({"version": self.version}))
+        os.replace(tmp_manifest_path, manifest_path)
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            meta = json.loads(self._meta_path.read_text())
+            points = json.loads(self._points_path.read_text())
+            self._ids, self._payloads = points["ids"], points["payloads"]
+
+            if meta["num_points"] > 0:
+                self._vectors = np.memmap(
+                    self._vectors_path, dtype=np.float32, mode="r", shape=(meta["num_points"], meta["dim"])
+                )
+
+                if self._hnsw_path.exists() and hnswlib is not None:
+                    self._hnsw_index = hnswlib.Index(space="cosine", dim=meta["dim"])
+                    self._hnsw_index.load_index(str(self._hnsw_path), max_elements=meta["num_points"])
+
+            self._loaded = True
+
+
+# The indexes are reloaded whenever the feature pipeline rebuilds them, which rewrites their manifest.
+_indexes: dict[str, tuple[int | None, LocalVectorIndex | None]] = {}
+_indexes_lock = Lock()
+
+
+def get_local_vector_index(collection_name: str) -> LocalVectorIndex | None:
+    if not settings.USE_LOCAL_VECTOR_INDEX:
+        return None
+
+    try:
+        manifest_mtime = LocalVectorIndex.get_manifest_path(collection_name).stat().st_mtime_ns
+    except FileNotFoundError:
+        manifest_mtime = None
+
+    with _indexes_lock:
+        if collection_name in _indexes and _indexes[collection_name][0] == manifest_mtime:
+            return _indexes[collection_name][1]
+
+        index = LocalVectorIndex(collection_name) if manifest_mtime is not None else None
+        if index is None or not index.exists():
+            logger.warning(f"No local vector index found for '{collection_name}'. Searching Qdrant instead.")
+            index = None
+        else:
+            logger.info(f"Loaded version {index.version} of the local vector index of '{collection_name}'.")
+
+        _indexes[collection_name] = (manifest_mtime, index)
+
+        return index
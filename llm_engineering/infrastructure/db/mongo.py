@@ -2,6 +2,7 @@ from loguru import logger
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 
+from llm_engineering.infrastructure.lazy import LazyObject
 from llm_engineering.settings import settings
 
 
@@ -23,4 +24,4 @@ class MongoDatabaseConnector:
         return cls._instance
 
 
-connection = MongoDatabaseConnector()
\ No newline at end of file
+connection: MongoClient = LazyObject(MongoDatabaseConnector)  # type: ignore[assignment]
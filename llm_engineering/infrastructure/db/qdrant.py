@@ -1,7 +1,8 @@
 from loguru import logger
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http.exceptions import UnexpectedResponse
 
+from llm_engineering.infrastructure.lazy import LazyObject
 from llm_engineering.settings import settings
 
 
@@ -40,4 +41,30 @@ class QdrantDatabaseConnector:
         return cls._instance
 
 
-connection = QdrantDatabaseConnector()
\ No newline at end of file
+class AsyncQdrantDatabaseConnector:
+    _instance: AsyncQdrantClient | None = None
+
+    def __new__(cls, *args, **kwargs) -> AsyncQdrantClient:
+        if cls._instance is None:
+            if settings.USE_QDRANT_CLOUD:
+                cls._instance = AsyncQdrantClient(
+                    url=settings.QDRANT_CLOUD_URL,
+                    api_key=settings.QDRANT_APIKEY,
+                )
+
+                uri = settings.QDRANT_CLOUD_URL
+            else:
+                cls._instance = AsyncQdrantClient(
+                    host=settings.QDRANT_DATABASE_HOST,
+                    port=settings.QDRANT_DATABASE_PORT,
+                )
+
+                uri = f"{settings.QDRANT_DATABASE_HOST}:{settings.QDRANT_DATABASE_PORT}"
+
+            logger.info(f"Async connection to Qdrant DB with URI created: {uri}")
+
+        return cls._instance
+
+
+connection: QdrantClient = LazyObject(QdrantDatabaseConnector)  # type: ignore[assignment]
+async_connection: AsyncQdrantClient = LazyObject(AsyncQdrantDatabaseConnector)  # type: ignore[assignment]
\ No newline at end of file
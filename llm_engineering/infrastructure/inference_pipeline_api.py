@@ -1,18 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import opik
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from opik import opik_context
 from pydantic import BaseModel
 
 from llm_engineering.settings import settings
-from llm_engineering.application.rag.retriever import ContextRetriever
+from llm_engineering.application.rag.retriever import AsyncContextRetriever, ContextRetriever
 from llm_engineering.application.utils import misc
 from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.infrastructure.lazy import LazyObject
+from llm_engineering.infrastructure.metrics import metrics
 from llm_engineering.infrastructure.opik_utils import configure_opik
 from llm_engineering.model.inference import InferenceExecutor, LLMInferenceSagemakerEndpoint
 
 configure_opik()
 
-app = FastAPI()
+# The retriever is shared by all the requests. Creating it loads the reranking model and the caches, which would block
+# the event loop, so it's created in a thread when the API starts.
+async_retriever: AsyncContextRetriever = LazyObject(  # type: ignore[assignment]
+    lambda: AsyncContextRetriever(mock=False)
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(async_retriever.resolve)
+
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class QueryRequest(BaseModel):
@@ -44,11 +64,37 @@ def rag(query: str) -> str:
     return answer
 
 
+@opik.track
+async def acall_llm_service(query: str, context: str | None) -> str:
+    llm = LLMInferenceSagemakerEndpoint(
+        endpoint_name=settings.SAGEMAKER_ENDPOINT_INFERENCE, inference_component_name=None
+    )
+    answer = await InferenceExecutor(llm, query, context).aexecute()
+
+    return answer
+
+
+@opik.track
+async def arag(query: str) -> str:
+    documents = await async_retriever.asearch(query, k=5)
+    context = EmbeddedChunk.to_context(documents)
+
+    answer = await acall_llm_service(query, context)
+
+    return answer
+
+
 @app.post("/rag", response_model=QueryResponse)
 async def rag_endpoint(request: QueryRequest):
     try:
-        answer = rag(query=request.query)
+        answer = await arag(query=request.query)
 
         return {"answer": answer}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    # The latency histograms of every RAG stage, in the Prometheus text exposition format.
+    return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,58 @@
+from threading import Lock
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+class LazyObject(Generic[T]):
+    """
+    A thread-safe proxy that creates the wrapped object on first use.
+
+    It is used for module-level objects that are expensive to create (settings loaded from the secret store,
+    database clients, models), so importing a module doesn't pay for components that are never used.
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_lock", Lock())
+        object.__setattr__(self, "_wrapped", _UNSET)
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._wrapped is not _UNSET
+
+    def resolve(self) -> T:
+        if self._wrapped is _UNSET:
+            with self._lock:
+                if self._wrapped is _UNSET:
+                    object.__setattr__(self, "_wrapped", self._factory())
+
+        return self._wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        # Probes like copy, pickle or hasattr look up dunder and private names, which must not create the object.
+        # An unpickled proxy also lacks its own attributes, so resolving it would recurse.
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.resolve(), name, value)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.resolve()[key]
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        if not self.is_initialized:
+            return f"<LazyObject: {self._factory!r} (not initialized)>"
+
+        return repr(self._wrapped)
+
+    def __str__(self) -> str:
+        return str(self.resolve())
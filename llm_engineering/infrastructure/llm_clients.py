@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from functools import cache
+
+import google.generativeai as genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+from loguru import logger
+
+from llm_engineering.settings import settings
+
+# The LLM clients are created once per process and shared by all the requests, so their underlying gRPC channels and
+# HTTP connections are kept alive and reused instead of being set up, with a new TLS handshake, on every call.
+
+
+@cache
+def get_chat_model(temperature: float = 0.0) -> ChatGoogleGenerativeAI:
+    logger.info(f"Creating the shared LangChain Gemini client for {settings.GOOGLE_GEMINI_MODEL=} and {temperature=}.")
+
+    return ChatGoogleGenerativeAI(
+        model=settings.GOOGLE_GEMINI_MODEL,
+        google_api_key=settings.GOOGLE_API_KEY,
+        temperature=temperature,
+        timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+    )
+
+
+@cache
+def get_generative_model() -> genai.GenerativeModel:
+    logger.info(f"Creating the shared Gemini client for {settings.GOOGLE_GEMINI_MODEL=}.")
+
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+    return genai.GenerativeModel(settings.GOOGLE_GEMINI_MODEL)
+
+
+def get_request_options() -> dict:
+    """Returns the per-call options of the google.generativeai requests."""
+
+    return {"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS}
+
+
+@cache
+def _get_semaphore() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+
+
+# An asyncio.Semaphore binds to the event loop it's first used on, so each running loop gets its own.
+_async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_semaphores_lock = threading.Lock()
+
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+
+    with _async_semaphores_lock:
+        semaphore = _async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _async_semaphores[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    return semaphore
+
+
+@contextmanager
+def llm_call_slot():
+    """Bounds the number of concurrent, blocking LLM calls. Extra calls wait for a free slot."""
+
+    with _get_semaphore():
+        yield
+
+
+@asynccontextmanager
+async def allm_call_slot():
+    """Bounds the number of concurrent LLM calls awaited on the event loop. Extra calls wait for a free slot."""
+
+    async with _get_async_semaphore():
+        yield
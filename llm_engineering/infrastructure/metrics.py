@@ -0,0 +1,225 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SNAPSHOT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    A thread-safe, cumulative histogram of observations split by label values, as in Prometheus.
+
+    Observing a value costs a binary search over the bucket bounds and a few counter increments under a lock, so it's
+    cheap enough for the hot path.
+
+    Args:
+        name (str): The metric name.
+        documentation (str): A short description of the metric.
+        buckets (tuple[float, ...]): The upper bounds of the buckets, in increasing order.
+    """
+
+    def __init__(self, name: str, documentation: str = "", buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        # Label values -> (per-bucket counts, with a last +Inf bucket, sum of the observations).
+        self._series: dict[tuple[tuple[str, str], ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(sorted((name, str(label_value)) for name, label_value in labels.items()))
+        bucket = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bucket] += 1
+            series[1][0] += value
+
+    def time(self, **labels: Any) -> "Timer":
+        """
+        Times a block of code or every call of a function, sync or async, into the histogram.
+
+        Example:
+            with histogram.time(stage="rerank"):
+                ...
+
+            @histogram.time(stage="embedding")
+            def embed(...): ...
+        """
+
+        return Timer(self, labels)
+
+    def collect(self) -> list[tuple[dict[str, str], list[int], float]]:
+        """Returns the label values, the per-bucket (non-cumulative) counts and the sum of every series."""
+
+        with self._lock:
+            return [(dict(key), list(counts), total[0]) for key, (counts, total) in self._series.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def quantile(self, q: float, counts: list[int]) -> float | None:
+        """Estimates a quantile from the bucket counts by linear interpolation within the bucket, as Prometheus does."""
+
+        total = sum(counts)
+        if total == 0:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    # The +Inf bucket has no upper bound, so the largest finite bound is the best estimate.
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+
+        return self.buckets[-1]
+
+
+class Timer:
+    def __init__(self, histogram: Histogram, labels: dict[str, Any]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._start_time: float | None = None
+
+    def __enter__(self) -> "Timer":
+        self._start_time = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start_time, **self._labels)
+
+    def __call__(self, func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._histogram.observe(time.perf_counter() - start_time, **self._labels)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._histogram.observe(time.perf_counter() - start_time, **self._labels)
+
+        return wrapper
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "llm_twin") -> None:
+        self.namespace = namespace
+
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+
+    def histogram(self, name: str, documentation: str = "", buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram registered under the name, creating it on first use."""
+
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            if full_name not in self._histograms:
+                self._histograms[full_name] = Histogram(full_name, documentation=documentation, buckets=buckets)
+
+            return self._histograms[full_name]
+
+    def clear(self) -> None:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.clear()
+
+    def to_prometheus(self) -> str:
+        """Renders all the histograms in the Prometheus text exposition format."""
+
+        with self._lock:
+            histograms = list(self._histograms.values())
+
+        lines = []
+        for histogram in histograms:
+            lines.append(f"# HELP {histogram.name} {histogram.documentation}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+            for labels, counts, total in histogram.collect():
+                cumulative = 0
+                for upper_bound, count in zip((*histogram.buckets, float("inf")), counts, strict=True):
+                    cumulative += count
+                    le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+                    lines.append(f"{histogram.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{histogram.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{histogram.name}_count{_format_labels(labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, float | int | None]]]:
+        """
+        Summarizes every series as its count, mean and estimated quantiles, in milliseconds.
+
+        The snapshot is JSON-serializable, so it can be attached as ZenML step metadata.
+
+        Returns:
+            dict: The summary of every series, keyed by metric name and formatted label values.
+        """
+
+        with self._lock:
+            histograms = list(self._histograms.values())
+
+        snapshot = {}
+        for histogram in histograms:
+            series_snapshot = {}
+            for labels, counts, total in histogram.collect():
+                count = sum(counts)
+                summary: dict[str, float | int | None] = {
+                    "count": count,
+                    "mean_ms": total / count * 1000 if count else None,
+                }
+                for q in SNAPSHOT_QUANTILES:
+                    value = histogram.quantile(q, counts)
+                    summary[f"p{int(q * 100)}_ms"] = value * 1000 if value is not None else None
+                series_snapshot[",".join(f"{k}={v}" for k, v in sorted(labels.items())) or "all"] = summary
+            if series_snapshot:
+                snapshot[histogram.name] = series_snapshot
+
+        return snapshot
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+
+    formatted = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items())
+
+    return f"{{{formatted}}}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+# The latency of every stage of the RAG pipeline: query embedding, self-query, query expansion, search, reranking and
+# generation.
+rag_stage_seconds = metrics.histogram("rag_stage_seconds", "Latency of the RAG pipeline stages, in seconds.")
+# The latency of the local embedding and cross-encoder model calls, labeled by model.
+model_call_seconds = metrics.histogram("model_call_seconds", "Latency of the local model calls, in seconds.")
@@ -1,4 +1,5 @@
 import os
+from functools import cache
 
 import opik
 from loguru import logger
@@ -7,6 +8,7 @@ from opik.configurator.configure import OpikConfigurator
 from llm_engineering.settings import settings
 
 
+@cache
 def configure_opik() -> None:
     if settings.COMET_API_KEY and settings.COMET_PROJECT:
         try:
@@ -2,7 +2,6 @@ import json
 from typing import Any, Dict, Optional
 
 from loguru import logger
-import google.generativeai as genai
 
 try:
     import boto3
@@ -11,6 +10,12 @@ except ModuleNotFoundError:
 
 
 from llm_engineering.domain.inference import Inference
+from llm_engineering.infrastructure.llm_clients import (
+    allm_call_slot,
+    get_generative_model,
+    get_request_options,
+    llm_call_slot,
+)
 from llm_engineering.settings import settings
 
 
@@ -27,9 +32,8 @@ class LLMInferenceSagemakerEndpoint(Inference):
     ) -> None:
         super().__init__()
 
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-
-        model = genai.GenerativeModel(settings.GOOGLE_GEMINI_MODEL)
+        # The Gemini client is shared across the instances, so its connections are reused between requests.
+        model = get_generative_model()
 
         # self.client = boto3.client(
         #     "sagemaker-runtime",
@@ -99,38 +103,83 @@ class LLMInferenceSagemakerEndpoint(Inference):
 
         try:
             logger.info("Inference request sent to Gemini.")
-            
-            # Extract input text and parameters from payload
-            input_text = self.payload["inputs"]
-            generation_config = {
-                "max_output_tokens": self.payload["parameters"].get("max_new_tokens", 1024),
-                "temperature": self.payload["parameters"].get("temperature", 0.7),
-                "top_p": self.payload["parameters"].get("top_p", 0.95),
-            }
 
             # Generate response using Gemini
-            response = self.client.generate_content(
-                input_text,
-                generation_config=generation_config
-            )
-
-            # Extract usage metadata
-            usage_metadata = response.usage_metadata
-
-            # Format response to match expected structure
-            result = {
-                "generated_text": response.text,
-                "model": settings.GOOGLE_GEMINI_MODEL,
-                "usage": {
-                    "prompt_tokens": usage_metadata.prompt_token_count,
-                    "completion_tokens": usage_metadata.candidates_token_count,
-                    "total_tokens": usage_metadata.total_token_count
-                }
-            }
+            with llm_call_slot():
+                response = self.client.generate_content(
+                    self.payload["inputs"],
+                    generation_config=self._generation_config(),
+                    request_options=get_request_options(),
+                )
 
-            return result
+            return self._format_response(response)
 
         except Exception:
             logger.exception("SageMaker inference failed.")
 
             raise
+
+    async def ainference(self) -> Dict[str, Any]:
+        """
+        Performs the inference request asynchronously, without blocking the event loop.
+
+        Returns:
+            dict: The response from the inference request.
+        Raises:
+            Exception: If an error occurs during the inference request.
+        """
+
+        try:
+            logger.info("Async inference request sent to Gemini.")
+
+            async with allm_call_slot():
+                response = await self.client.generate_content_async(
+                    self.payload["inputs"],
+                    generation_config=self._generation_config(),
+                    request_options=get_request_options(),
+                )
+
+            return self._format_response(response)
+
+        except Exception:
+            logger.exception("Async Gemini inference failed.")
+
+            raise
+
+    def _generation_config(self) -> Dict[str, Any]:
+        """
+        Extracts the Gemini generation config from the payload parameters.
+
+        Returns:
+            dict: The generation config.
+        """
+
+        return {
+            "max_output_tokens": self.payload["parameters"].get("max_new_tokens", 1024),
+            "temperature": self.payload["parameters"].get("temperature", 0.7),
+            "top_p": self.payload["parameters"].get("top_p", 0.95),
+        }
+
+    def _format_response(self, response) -> Dict[str, Any]:
+        """
+        Formats the Gemini response to match the expected structure.
+
+        Args:
+            response: The Gemini response.
+
+        Returns:
+            dict: The generated text, the model and the token usage.
+        """
+
+        # Extract usage metadata
+        usage_metadata = response.usage_metadata
+
+        return {
+            "generated_text": response.text,
+            "model": settings.GOOGLE_GEMINI_MODEL,
+            "usage": {
+                "prompt_tokens": usage_metadata.prompt_token_count,
+                "completion_tokens": usage_metadata.candidates_token_count,
+                "total_tokens": usage_metadata.total_token_count
+            }
+        }
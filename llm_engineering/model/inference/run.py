@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from llm_engineering.domain.inference import Inference
+from llm_engineering.infrastructure.metrics import rag_stage_seconds
 from llm_engineering.settings import settings
 
 
@@ -27,6 +28,20 @@ Context: {context}
             self.prompt = prompt
 
     def execute(self) -> str:
+        self._set_payload()
+        with rag_stage_seconds.time(stage="generation"):
+            answer = self.llm.inference()["generated_text"]
+
+        return answer
+
+    async def aexecute(self) -> str:
+        self._set_payload()
+        with rag_stage_seconds.time(stage="generation"):
+            answer = (await self.llm.ainference())["generated_text"]
+
+        return answer
+
+    def _set_payload(self) -> None:
         self.llm.set_payload(
             inputs=self.prompt.format(query=self.query, context=self.context),
             parameters={
@@ -35,6 +50,3 @@ Context: {context}
                 "temperature": settings.TEMPERATURE_INFERENCE,
             },
         )
-        answer = self.llm.inference()["generated_text"]
-
-        return answer
@@ -1,6 +1,7 @@
 from loguru import logger
 from pydantic_settings import BaseSettings
-from zenml.client import Client
+
+from llm_engineering.infrastructure.lazy import LazyObject
 
 class Settings(BaseSettings):
     class Config:
@@ -19,17 +20,65 @@ class Settings(BaseSettings):
     TEXT_EMBEDDING_MODEL_ID: str = "sentence-transformers/all-MiniLM-L6-v2"
     RERANKING_CROSS_ENCODER_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-4-v2"
     RAG_MODEL_DEVICE: str = "cpu"
+    RAG_MODEL_BACKEND: str = "torch"  # One of "torch", "onnx" or "onnx-int8".
+    RAG_ONNX_QUANTIZATION_CONFIG: str = "avx2"  # One of "arm64", "avx2", "avx512" or "avx512_vnni".
+    RAG_ONNX_EXPORT_DIR: str = ".cache/onnx"
+    EMBEDDING_BATCH_TOKEN_BUDGET: int = 8192
+    EMBEDDING_DISPATCH_BATCH_SIZE: int = 256
+    EMBEDDING_NUM_WORKERS: int = 0  # Values > 1 enable the multi-process embedding pool.
+    EMBEDDING_POOL_MIN_BATCH_SIZE: int = 128
+    EMBEDDING_MICRO_BATCH_ENABLED: bool = True
+    EMBEDDING_MICRO_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_MICRO_BATCH_MAX_WAIT_MS: float = 3.0
+    RERANKING_CACHE_MAX_SIZE: int = 100_000  # Set to 0 to disable the cross-encoder score cache.
+    RERANKING_CACHE_TTL_SECONDS: float = 3600.0
+    RERANKING_PREFILTER_TOP_M: int = 20  # Set to 0 to send every retrieved chunk to the cross-encoder.
+    RERANKING_LATENCY_BUDGET_MS: float | None = None
+    RETRIEVAL_PLANNER_STRATEGY: str = "static"  # One of "static" or "proportional" (to the collection sizes).
+    RETRIEVAL_CATEGORY_WEIGHTS: dict[str, float] = {"posts": 1.0, "articles": 1.0, "repositories": 1.0}
+    USE_FUSED_SELF_QUERY_EXPANSION: bool = False  # Extract the author and expand the query with a single LLM call.
+    USE_HYBRID_SEARCH: bool = False  # Also stores BM25 vectors. Existing collections must be re-created first.
+    HYBRID_SEARCH_RRF_K: int = 60
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    RAG_MODEL_EXECUTOR_MAX_WORKERS: int = 4  # Bounds the concurrent model calls of the async API.
     TEMPERATURE_INFERENCE: float = 0.0
     MAX_NEW_TOKENS_INFERENCE: int = 256
     TOP_P_INFERENCE: float = 0.9
     TEMPERATURE_INFERENCE: float = 0.0
+
+    # Embedding cache
+    USE_EMBEDDING_CACHE: bool = True
+    EMBEDDING_CACHE_DIR: str = ".cache/embeddings"
     
+    # Semantic query cache
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_MAX_SIZE: int = 1024
+    SEMANTIC_CACHE_INVALIDATION_CHECK_SECONDS: float = 30.0
+
+    # Query expansion cache
+    QUERY_EXPANSION_CACHE_ENABLED: bool = True
+    QUERY_EXPANSION_CACHE_PATH: str = ".cache/query_expansion.sqlite"  # Shared by the API workers of the same host.
+    QUERY_EXPANSION_CACHE_MAX_SIZE: int = 10_000  # The number of expansions also kept in memory.
+
+    # Author directory
+    AUTHOR_DIRECTORY_REFRESH_SECONDS: float = 300.0  # How long the cached users are served before reloading them.
+    AUTHOR_DIRECTORY_FUZZY_CUTOFF: float = 0.85  # The minimum similarity to resolve a misspelled author name.
+
     # QdrantDB Vector DB
     USE_QDRANT_CLOUD: bool = False
     QDRANT_DATABASE_HOST: str = "localhost"
     QDRANT_DATABASE_PORT: int = 6333
     QDRANT_CLOUD_URL: str = "str"
     QDRANT_APIKEY: str | None = None
+    USE_LOCAL_VECTOR_INDEX: bool = False  # Search an in-process mirror of the collections instead of Qdrant.
+    LOCAL_VECTOR_INDEX_DIR: str = ".cache/vector_index"
+    LOCAL_VECTOR_INDEX_USE_HNSW: bool = False  # Requires hnswlib. Otherwise, the search is exact (brute-force).
+    VECTOR_DB_UPSERT_BATCH_SIZE: int = 256
+    VECTOR_DB_UPSERT_WAIT: bool = False  # Don't wait for every batch to be indexed before sending the next ones.
+    VECTOR_DB_UPSERT_PARALLEL: int = 4  # The maximum number of in-flight upsert requests.
+    VECTOR_DB_UPSERT_MAX_RETRIES: int = 3
 
     # HuggingFace Configuration
     HF_TOKEN: str | None = None
@@ -39,6 +88,9 @@ class Settings(BaseSettings):
     # Google Gemini Configuration
     GOOGLE_API_KEY: str | None = None
     GOOGLE_GEMINI_MODEL: str = "gemini-2.0-flash"
+    LLM_MAX_CONCURRENCY: int = 16  # The maximum number of in-flight LLM calls per process, for each of sync and async.
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 30.0
+    LLM_MAX_RETRIES: int = 2
 
     # Opik / Comet ML Configuration
     COMET_API_KEY: str | None = None
@@ -61,6 +113,8 @@ class Settings(BaseSettings):
             Settings: The initialized settings object.
         """
 
+        from zenml.client import Client
+
         try:
             logger.info("Loading settings from the ZenML secret store.")
 
@@ -74,4 +128,5 @@ class Settings(BaseSettings):
 
         return settings
 
-settings = Settings.load_settings()
\ No newline at end of file
+# Contacting the ZenML secret store is slow, so the settings are only loaded when first accessed.
+settings: Settings = LazyObject(Settings.load_settings)  # type: ignore[assignment]
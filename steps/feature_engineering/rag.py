@@ -3,8 +3,11 @@ from zenml import get_step_context, step
 
 from llm_engineering.application import utils
 from llm_engineering.application.preprocessing import ChunkingDispatcher, EmbeddingDispatcher
+from llm_engineering.domain.base import VectorBaseDocument
 from llm_engineering.domain.chunks import Chunk
 from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.infrastructure.metrics import metrics
+from llm_engineering.settings import settings
 
 
 @step
@@ -13,18 +16,23 @@ def chunk_and_embed(
 ) -> Annotated[list, "embedded_documents"]:
     metadata = {"chunking": {}, "embedding": {}, "num_documents": len(cleaned_documents)}
 
-    embedded_chunks = []
+    chunks = []
     for document in cleaned_documents:
-        chunks = ChunkingDispatcher.dispatch(document)
-        metadata["chunking"] = _add_chunks_metadata(chunks, metadata["chunking"])
+        document_chunks = ChunkingDispatcher.dispatch(document)
+        metadata["chunking"] = _add_chunks_metadata(document_chunks, metadata["chunking"])
+        chunks.extend(document_chunks)
 
-        for batched_chunks in utils.misc.batch(chunks, 10):
+    # Embed chunks across documents in large batches, so the model can bucket them by length.
+    embedded_chunks = []
+    for category_chunks in VectorBaseDocument.group_by_category(chunks).values():
+        for batched_chunks in utils.misc.batch(category_chunks, settings.EMBEDDING_DISPATCH_BATCH_SIZE):
             batched_embedded_chunks = EmbeddingDispatcher.dispatch(batched_chunks)
             embedded_chunks.extend(batched_embedded_chunks)
 
     metadata["embedding"] = _add_embeddings_metadata(embedded_chunks, metadata["embedding"])
     metadata["num_chunks"] = len(embedded_chunks)
     metadata["num_embedded_chunks"] = len(embedded_chunks)
+    metadata["latency"] = metrics.snapshot()
 
     step_context = get_step_context()
     step_context.add_output_metadata(output_name="embedded_documents", metadata=metadata)
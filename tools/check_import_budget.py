@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+import click
+
+# Runs in a fresh interpreter, so the modules already imported by this CLI don't skew the timing.
+_PROBE = """
+import sys
+import time
+
+start_time = time.perf_counter()
+import llm_engineering.application.preprocessing
+import_time = time.perf_counter() - start_time
+
+from llm_engineering.application.networks.base import SingletonMeta
+from llm_engineering.application.preprocessing.embedding_data_handlers import embedding_model
+from llm_engineering.settings import settings
+
+print(import_time)
+print(settings.is_initialized)
+print(embedding_model.is_initialized or len(SingletonMeta._instances) > 0)
+print(",".join(module for module in ("torch", "sentence_transformers", "zenml") if module in sys.modules))
+"""
+
+
+@click.command(
+    help="""
+Checks that importing the preprocessing package stays cheap.
+
+It fails if the import takes longer than the budget, resolves the settings, loads a model
+or imports torch, sentence-transformers or ZenML.
+"""
+)
+@click.option(
+    "--max-seconds",
+    default=2.0,
+    help="The import time budget, in seconds.",
+)
+def main(max_seconds: float) -> None:
+    output = subprocess.run([sys.executable, "-c", _PROBE], check=True, capture_output=True, text=True).stdout
+    import_time, settings_resolved, model_loaded, heavy_modules = output.strip("\n").split("\n")
+    import_time = float(import_time)
+
+    click.echo(f"Imported llm_engineering.application.preprocessing in {import_time:.3f} seconds.")
+
+    if import_time > max_seconds:
+        raise click.ClickException(f"The import took {import_time:.3f}s, over the {max_seconds:.3f}s budget.")
+    if settings_resolved != "False":
+        raise click.ClickException("Importing the preprocessing package resolved the settings.")
+    if model_loaded != "False":
+        raise click.ClickException("Importing the preprocessing package loaded a model.")
+    if heavy_modules != "":
+        raise click.ClickException(f"Importing the preprocessing package imported {heavy_modules}.")
+
+
+if __name__ == "__main__":
+    main()
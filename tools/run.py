@@ -100,6 +100,29 @@ Examples:
     default=False,
     help="Whether to run the evaluation pipeline.",
 )
+@click.option(
+    "--run-backend-parity-check",
+    is_flag=True,
+    default=False,
+    help="Whether to compare the outputs of the RAG_MODEL_BACKEND models against the PyTorch ones.",
+)
+@click.option(
+    "--run-benchmark",
+    is_flag=True,
+    default=False,
+    help="Whether to benchmark the throughput of the embedding and cross-encoder models.",
+)
+@click.option(
+    "--benchmark-output-path",
+    default=None,
+    help="Where to write the JSON results of the models benchmark.",
+)
+@click.option(
+    "--build-local-vector-index",
+    is_flag=True,
+    default=False,
+    help="Whether to snapshot the Qdrant collections into the in-process vector index.",
+)
 @click.option(
     "--export-settings",
     is_flag=True,
@@ -117,6 +140,10 @@ def main(
     run_generate_preference_datasets: bool = False,
     run_training: bool = False,
     run_evaluation: bool = False,
+    run_backend_parity_check: bool = False,
+    run_benchmark: bool = False,
+    benchmark_output_path: str | None = None,
+    build_local_vector_index: bool = False,
     export_settings: bool = False,
 ) -> None:
     assert (
@@ -128,6 +155,9 @@ def main(
         or run_generate_preference_datasets
         or run_training
         or run_evaluation
+        or run_backend_parity_check
+        or run_benchmark
+        or build_local_vector_index
         or export_settings
     ), "Please specify an action to run."
 
@@ -161,6 +191,28 @@ def main(
         pipeline_args["run_name"] = f"feature_engineering_run_{dt.now().strftime('%Y_%m_%d_%H_%M_%S')}"
         feature_engineering.with_options(**pipeline_args)(**run_args_fe)
 
+    # The models and the database clients are imported only by the commands that use them, to keep the CLI fast.
+    if run_backend_parity_check:
+        from llm_engineering.application.networks.parity import check_backend_parity
+
+        check_backend_parity()
+
+    if run_benchmark:
+        from llm_engineering.application.networks.benchmark import run_models_benchmark
+
+        run_models_benchmark(output_path=Path(benchmark_output_path) if benchmark_output_path else None)
+
+    if build_local_vector_index:
+        from llm_engineering.domain.embedded_chunks import (
+            EmbeddedArticleChunk,
+            EmbeddedPostChunk,
+            EmbeddedRepositoryChunk,
+        )
+        from llm_engineering.infrastructure.db.local_index import LocalVectorIndex
+
+        for embedded_chunk_class in (EmbeddedPostChunk, EmbeddedArticleChunk, EmbeddedRepositoryChunk):
+            LocalVectorIndex.build(embedded_chunk_class.get_collection_name())
+
 
 if __name__ == "__main__":
     main()